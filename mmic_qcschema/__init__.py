@@ -3,12 +3,40 @@ mmic_qcschema
 MMSchema to/from QCSchema converter
 """
 
-# Add imports here
-from . import components
-from . import models
+# Submodules are imported lazily on first attribute access since they pull in
+# heavy dependencies (qcelemental, mmelemental, mmic_translator, pint).
+import importlib
 
-from .mmic_qcschema import molwrite_ext_maps, molread_ext_maps, __version__
+from .mmic_qcschema import molwrite_ext_maps, molread_ext_maps
 
-_classes_map = {
-    "Molecule": models.QCSchemaMol,
+_submodules = {
+    "cache",
+    "components",
+    "compression",
+    "elements",
+    "models",
+    "parallel",
+    "profiling",
+    "qcmm",
+    "units",
 }
+
+
+def __getattr__(name):
+    if name == "__version__":
+        from . import mmic_qcschema
+
+        return mmic_qcschema.__version__
+    elif name in _submodules:
+        return importlib.import_module("." + name, __name__)
+    elif name == "_classes_map":
+        from .models import QCSchemaMol
+
+        globals()["_classes_map"] = {"Molecule": QCSchemaMol}
+        return globals()["_classes_map"]
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_submodules) + ["_classes_map", "__version__"])
@@ -0,0 +1,342 @@
+"""
+cache.py
+Content-hash keyed caches for MMSchema <-> QCSchema conversions.
+
+Cached molecules returned by ConversionCache are shared by every caller that
+hits the same key, so they must be treated as read-only.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy
+from .mmic_qcschema import serialization_encodings, _parse_mol
+
+__all__ = ["ConversionCache", "DiskConversionCache", "content_hash"]
+
+
+def _hash_update(hasher, value: Any):
+    """Feeds value into hasher. Arrays are hashed by dtype, shape, and raw bytes,
+    containers recursively, and anything else by its repr."""
+    if isinstance(value, numpy.ndarray):
+        hasher.update(f"ndarray{value.dtype.str}{value.shape}".encode())
+        if value.dtype.hasobject:
+            hasher.update(repr(value.tolist()).encode())
+        else:
+            hasher.update(numpy.ascontiguousarray(value).data)
+    elif isinstance(value, dict):
+        hasher.update(b"dict")
+        for key in sorted(value, key=str):
+            _hash_update(hasher, key)
+            _hash_update(hasher, value[key])
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _hash_update(hasher, item)
+    elif hasattr(value, "dict") and callable(value.dict):  # pydantic models
+        _hash_update(hasher, value.dict())
+    else:
+        hasher.update(repr(value).encode())
+
+
+def content_hash(mol: Any, **options: Any) -> str:
+    """Returns a hash of the molecule contents (geometry, symbols, charge,
+    connectivity, units, extras, etc.) and the conversion options.
+    Parameters
+    ----------
+    mol: mmelemental.models.Molecule or qcelemental.models.Molecule
+        Molecule to hash.
+    **options
+        Conversion options e.g. validate that affect the conversion output.
+    Returns
+    -------
+    str
+        Hex digest of the content hash.
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(f"{type(mol).__module__}.{type(mol).__name__}".encode())
+    # __dict__ holds the field values without the derived defaults computed by
+    # properties, e.g. QCSchema masses from symbols
+    fields = {key: val for key, val in mol.__dict__.items() if key != "provenance"}
+    _hash_update(hasher, fields)
+    _hash_update(hasher, options)
+    return hasher.hexdigest()
+
+
+def _nbytes(obj: Any) -> int:
+    """Estimates the memory used by a molecule from the size of its arrays."""
+    nbytes = 1024  # rough model overhead
+    for val in getattr(obj, "__dict__", {}).values():
+        if isinstance(val, numpy.ndarray):
+            nbytes += val.nbytes
+        elif isinstance(val, (list, tuple)):
+            nbytes += 64 * len(val)
+    return nbytes
+
+
+class ConversionCache:
+    """In-memory LRU cache of converted molecules keyed by content hash. It is safe
+    to share between threads, e.g. the executor threads of QCSchemaMol.afrom_schema.
+    Parameters
+    ----------
+    max_bytes: int, optional
+        Upper bound on the estimated memory of cached molecules. The least
+        recently used entries are evicted beyond it.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the molecule stored for key, or None if not cached."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any):
+        """Stores value for key, evicting least recently used entries as needed.
+        Values larger than max_bytes are not cached."""
+        nbytes = _nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._data:
+                self.nbytes -= self._sizes[key]
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._sizes[key] = nbytes
+            self.nbytes += nbytes
+
+            while self.nbytes > self.max_bytes:
+                old, _ = self._data.popitem(last=False)
+                self.nbytes -= self._sizes.pop(old)
+                self.evictions += 1
+
+    def clear(self):
+        """Removes all entries and resets the statistics."""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def info(self) -> Dict[str, float]:
+        """Returns the cache statistics."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+            "entries": len(self._data),
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class DiskConversionCache:
+    """Persistent cache of converted molecules in an SQLite database, keyed by
+    content hash and the versions of the libraries involved in the conversion.
+    Molecules are stored as serialized blobs. The database can be shared by
+    several processes on the same node, and an instance by several threads, each
+    with its own connection.
+    Parameters
+    ----------
+    path: str
+        SQLite database filename. Created if it does not exist.
+    max_bytes: int, optional
+        Upper bound on the total size of stored blobs. The least recently used
+        entries are evicted beyond it.
+    timeout: float, optional
+        Seconds to wait for a lock held by another process.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 2 ** 30, timeout: float = 60.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._versions = None
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, "
+                "schema TEXT NOT NULL, data BLOB NOT NULL, size INTEGER NOT NULL, "
+                "atime REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS atime_idx ON entries (atime)")
+            # running total of the blob sizes, kept up to date by triggers so that
+            # eviction does not scan the whole table
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY "
+                "CHECK (id = 0), nbytes INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO totals "
+                "SELECT 0, COALESCE(SUM(size), 0) FROM entries"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries "
+                "BEGIN UPDATE totals SET nbytes = nbytes + NEW.size; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries "
+                "BEGIN UPDATE totals SET nbytes = nbytes - OLD.size; END"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # connections must not be shared across fork, nor across threads e.g. of
+        # the executor running QCSchemaMol.afrom_schema
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _key(self, key: str) -> str:
+        """Qualifies key with the library versions so that upgrades invalidate
+        stale entries."""
+        if self._versions is None:
+            import qcelemental
+            import mmelemental
+            from .mmic_qcschema import _get_versions
+
+            self._versions = (
+                f"{_get_versions()['version']}-{qcelemental.__version__}-"
+                f"{mmelemental.__version__}"
+            )
+        return f"{key}-{self._versions}"
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        row = (
+            self._connect()
+            .execute("SELECT 1 FROM entries WHERE key = ?", (self._key(key),))
+            .fetchone()
+        )
+        return row is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the stored blobs."""
+        return self._connect().execute("SELECT nbytes FROM totals").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the molecule stored for key, or None if not cached."""
+        key = self._key(key)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT schema, data FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE entries SET atime = ? WHERE key = ?", (time.time(), key)
+                )
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        schema, data = row
+        # QCSchema molecules were validated to the requested level when converted
+        return _parse_mol(data, schema)
+
+    def put(self, key: str, value: Any):
+        """Stores value for key, evicting least recently used entries as needed.
+        Values larger than max_bytes are not cached."""
+        import qcelemental
+
+        schema = (
+            "qcschema" if isinstance(value, qcelemental.models.Molecule) else "mmschema"
+        )
+        data = value.serialize(serialization_encodings[schema])
+        if len(data) > self.max_bytes:
+            return
+
+        key = self._key(key)
+        with self._connect() as conn:
+            # not INSERT OR REPLACE, whose implicit delete skips the triggers
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, schema, data, len(data), time.time()),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT nbytes FROM totals").fetchone()[0]
+        while total > self.max_bytes:
+            key, size = conn.execute(
+                "SELECT key, size FROM entries ORDER BY atime LIMIT 1"
+            ).fetchone()
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        """Removes all entries and resets the statistics."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+        self.hits = self.misses = 0
+
+    def close(self):
+        """Closes the connection of the calling thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups made by this process that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def info(self) -> Dict[str, float]:
+        """Returns the cache statistics. Hits and misses are counted per process."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entries": len(self),
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
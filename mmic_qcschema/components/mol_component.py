@@ -2,25 +2,461 @@ from mmic.components import TacticComponent
 from cmselemental.util.decorators import classproperty
 import qcelemental
 import mmelemental
-from ..mmic_qcschema import __version__
-from typing import Dict, Any, List, Tuple, Optional, Set
+from qcelemental.models.molecule import GEOMETRY_NOISE, float_prep
+from qcelemental.molparse.chgmult import validate_and_fill_chgmult
+from qcelemental.molparse.from_arrays import validate_and_fill_nuclei
+import numpy
+import functools
+import itertools
+from ..mmic_qcschema import _get_versions
+from ..units import conversion_factor, qc_units
+from .. import elements, profiling
+from typing import Dict, Any, List, Tuple, Optional, Set, Sequence
 
 from mmic_translator import (
     TransInput,
     TransOutput,
 )
 
-provenance_stamp = {
-    "creator": "mmic_qcschema",
-    "version": __version__,
-    "routine": __name__,
-}
-
 __all__ = ["MolToQCSchemaComponent", "QCSchemaToMolComponent"]
 
 
+@functools.lru_cache(maxsize=None)
+def _provenance_stamp() -> Dict[str, str]:
+    # resolving the version may be slow, so it is deferred until first needed
+    return {
+        "creator": "mmic_qcschema",
+        "version": _get_versions()["version"],
+        "routine": __name__,
+    }
+
+
+def __getattr__(name):
+    if name == "provenance_stamp":
+        return _provenance_stamp()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Validation levels for MMSchema -> QCSchema conversion:
+# "full": qcelemental molparse validation + pydantic field validation
+# "fast": pydantic field validation only, for input already validated by mmelemental
+# "none": no validation at all, for trusted input e.g. produced by the same pipeline
+validation_levels = ("full", "fast", "none")
+
+
+def _construct_qcmol(data: Dict[str, Any]) -> qcelemental.models.Molecule:
+    """Builds a QCSchema molecule without any validation. The per-atom fields are
+    only cast to the array shapes qcelemental expects."""
+    data["symbols"] = numpy.asarray(data["symbols"])
+    data["geometry"] = numpy.asarray(data["geometry"], dtype=float).reshape(-1, 3)
+    if data.get("identifiers") is not None:
+        data["identifiers"] = qcelemental.models.Identifiers(
+            **data["identifiers"].dict()
+        )
+    return qcelemental.models.Molecule.construct(**data)
+
+
+def _check_overlaps(
+    geometry: numpy.ndarray, tooclose: float = 0.1, chunksize: int = 65536
+):
+    """Raises a ValueError if any two atoms are closer than tooclose (bohr), like the
+    qcelemental geometry validation, but without its O(natoms**2) loop. Atoms are
+    binned into cells of at least tooclose, so only atoms in the same or adjacent
+    cells are compared. Temporaries are bounded by chunksize atoms."""
+    natoms = len(geometry)
+    if natoms < 2:
+        return
+
+    lower, upper = geometry.min(axis=0), geometry.max(axis=0)
+    # coarser cells for widely spread atoms so the cell keys fit in int64
+    size = max(tooclose, float((upper - lower).max()) / 2 ** 20)
+    lower = numpy.floor(lower / size) - 1
+    dims = (numpy.floor(upper / size) - lower + 2).astype(numpy.int64)
+
+    keys = numpy.empty(natoms, dtype=numpy.int64)
+    for start in range(0, natoms, chunksize):
+        cells = (
+            numpy.floor(geometry[start : start + chunksize] / size) - lower
+        ).astype(numpy.int64)
+        keys[start : start + chunksize] = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[
+            2
+        ] + cells[:, 2]
+
+    order = numpy.argsort(keys, kind="stable")
+    keys.sort()  # in place, keys[i] is now the cell of atom order[i]
+    shifts = [
+        (dx * dims[1] + dy) * dims[2] + dz
+        for dx, dy, dz in itertools.product((-1, 0, 1), repeat=3)
+    ]
+
+    overlaps = []
+    for start in range(0, natoms, chunksize):
+        chunk = keys[start : start + chunksize]
+        for shift in shifts:
+            lo = numpy.searchsorted(keys, chunk + shift, "left")
+            hi = numpy.searchsorted(keys, chunk + shift, "right")
+            # every atom is found in its own cell
+            for i in numpy.nonzero(hi - lo > (shift == 0))[0]:
+                atom = order[start + i]
+                others = order[lo[i] : hi[i]]
+                others = others[others > atom]
+                dists = numpy.linalg.norm(geometry[others] - geometry[atom], axis=1)
+                overlaps.extend(
+                    (int(atom), int(other), float(dist))
+                    for other, dist in zip(others, dists)
+                    if dist < tooclose
+                )
+
+    if overlaps:
+        raise ValueError(f"Following atoms are too close: {sorted(overlaps)}")
+
+
+def _validate_chunked(
+    data: Dict[str, Any], chunksize: int, inplace: bool = False
+) -> Dict[str, Any]:
+    """Validates the molecule fields in data like the "full" qcelemental validation,
+    but the per-atom arrays are processed chunksize atoms at a time, so the
+    temporaries are bounded by the chunk size instead of the molecule size. Only
+    charge and multiplicity are validated for the molecule as a whole. With
+    inplace=True, the geometry in data is rounded in place. Returns the fields to
+    construct the molecule from, with default per-atom fields left out."""
+    symbols = numpy.asarray(data["symbols"])
+    atomic_numbers = data["atomic_numbers"]
+    mass_numbers, masses = data["mass_numbers"], data.get("masses")
+    geometry = numpy.asarray(data["geometry"], dtype=float).reshape(-1, 3)
+    natoms = len(symbols)
+
+    _check_overlaps(geometry, chunksize=chunksize)
+
+    out = {
+        "symbols": numpy.empty(natoms, dtype=symbols.dtype),
+        "geometry": geometry if inplace else numpy.empty_like(geometry),
+    }
+    if mass_numbers is not None or masses is not None:
+        out["mass_numbers"] = numpy.empty(natoms, dtype=int)
+        out["masses"] = numpy.empty(natoms, dtype=float)
+    default_masses = True
+    zeff = numpy.empty(natoms, dtype=float)
+
+    for start in range(0, natoms, chunksize):
+        chunk = slice(start, start + chunksize)
+        nuclei = validate_and_fill_nuclei(
+            len(symbols[chunk]),
+            elea=None if mass_numbers is None else mass_numbers[chunk],
+            elez=atomic_numbers[chunk],
+            elem=symbols[chunk],
+            mass=None if masses is None else masses[chunk],
+            speclabel=False,
+            nonphysical=False,
+        )
+        out["symbols"][chunk] = nuclei["elem"]
+        out["geometry"][chunk] = float_prep(geometry[chunk], GEOMETRY_NOISE)
+        zeff[chunk] = nuclei["elez"] * nuclei["real"]
+        if "masses" in out:
+            out["mass_numbers"][chunk] = nuclei["elea"]
+            out["masses"][chunk] = nuclei["mass"]
+            default_masses = default_masses and numpy.allclose(
+                elements.masses(nuclei["elez"]), nuclei["mass"]
+            )
+
+    if "masses" in out and default_masses:
+        del out["mass_numbers"], out["masses"]
+
+    fields = {**data, **out}
+    # fragment charges and multiplicities are already consistent, see _substruct_fragments
+    if data.get("fragments") is None:
+        chgmult = validate_and_fill_chgmult(
+            zeff=zeff,
+            fragment_separators=numpy.array([], dtype=int),
+            molecular_charge=data["molecular_charge"],
+            fragment_charges=[None],
+            molecular_multiplicity=None,
+            fragment_multiplicities=[None],
+        )
+        fields["molecular_charge"] = chgmult["molecular_charge"]
+        fields["molecular_multiplicity"] = chgmult["molecular_multiplicity"]
+    del zeff
+
+    fields.update(
+        schema_name="qcschema_molecule",
+        schema_version=2,
+        fix_com=False,
+        fix_orientation=False,
+        provenance=_provenance_stamp(),
+        validated=True,
+    )
+    if fields.get("name") is None:
+        # the molecular formula, as in qcelemental
+        unique_symbols, counts = numpy.unique(out["symbols"], return_counts=True)
+        fields["name"] = "".join(
+            elem if count == 1 else f"{elem}{count}"
+            for elem, count in zip(unique_symbols.tolist(), counts.tolist())
+        )
+    return fields
+
+
+# mmelemental stores substructs as a structured array of (name, number)
+_substruct_dtype = numpy.dtype([("f0", "<U4"), ("f1", "<i8")])
+
+
+def _fragment_labels(fragments: List[numpy.ndarray], natoms: int) -> numpy.ndarray:
+    """Returns the fragment index of every atom."""
+    labels = numpy.empty(natoms, dtype=int)
+    labels[numpy.concatenate(fragments)] = numpy.repeat(
+        numpy.arange(len(fragments)), [len(frag) for frag in fragments]
+    )
+    return labels
+
+
+def _fragment_names(qcmol: qcelemental.models.Molecule) -> numpy.ndarray:
+    """Returns the substructure (name, number) of every fragment of qcmol, as kept in
+    extras["fragment_substructs"] by MolToQCSchemaComponent, or ("FRAG", index)."""
+    nfrags = len(qcmol.fragments)
+    names = (qcmol.extras or {}).get("fragment_substructs")
+    if names is not None and len(names) == nfrags:
+        return numpy.array([tuple(name) for name in names], dtype=_substruct_dtype)
+
+    names = numpy.empty(nfrags, dtype=_substruct_dtype)
+    names["f0"], names["f1"] = "FRAG", numpy.arange(nfrags)
+    return names
+
+
+def _fragment_formulas(
+    symbols: numpy.ndarray, labels: numpy.ndarray, nfrags: int
+) -> List[str]:
+    """Returns the molecular formula of every fragment, as in qcelemental, given the
+    fragment index of every atom. Atoms are counted per fragment and element with
+    a single bincount, and every distinct composition is formatted once."""
+    element_symbols, codes = numpy.unique(symbols, return_inverse=True)
+    counts = numpy.bincount(
+        labels * len(element_symbols) + codes.reshape(-1),
+        minlength=nfrags * len(element_symbols),
+    ).reshape(nfrags, len(element_symbols))
+    compositions, inverse = numpy.unique(counts, axis=0, return_inverse=True)
+    formulas = [
+        "".join(
+            elem if count == 1 else f"{elem}{count}"
+            for elem, count in zip(element_symbols.tolist(), row.tolist())
+            if count
+        )
+        for row in compositions
+    ]
+    return [formulas[index] for index in inverse.reshape(-1).tolist()]
+
+
+def _substruct_fragments(
+    mmol: "mmelemental.models.Molecule",
+    atomic_numbers: numpy.ndarray,
+    mol_charge: float,
+) -> Dict[str, Any]:
+    """Maps the MMSchema substructures (e.g. residues) of mmol to QCSchema fragments,
+    one per distinct (name, number), in order of first appearance. The atoms of
+    every substructure must be contiguous, since QCSchema fragments are. Fragment
+    charges are the sums of the atomic formal charges, and fragment multiplicities
+    the lowest ones consistent with their electron counts. All per-atom work is
+    vectorized. Returns the QCSchema fragment fields, and the [name, number] of
+    every fragment as "fragment_substructs"."""
+    names, first, labels = numpy.unique(
+        mmol.substructs, return_index=True, return_inverse=True
+    )
+    # relabel fragments in order of their first atom
+    order = numpy.argsort(first)
+    rank = numpy.empty_like(order)
+    rank[order] = numpy.arange(len(order))
+    labels = rank[labels.reshape(-1)]
+    nfrags = len(order)
+
+    # qcelemental would have to reorder the atoms otherwise
+    if (numpy.diff(labels) < 0).any():
+        raise ValueError(
+            "Substructures must be contiguous to map to QCSchema fragments, "
+            "reorder the atoms by substructure first."
+        )
+    fragments = numpy.split(
+        numpy.arange(len(labels)), numpy.cumsum(numpy.bincount(labels))[:-1]
+    )
+
+    if mmol.formal_charges is not None:
+        charge_factor = conversion_factor(
+            mmol.formal_charges_units, "elementary_charge"
+        )
+        charges = charge_factor * numpy.bincount(
+            labels, weights=mmol.formal_charges, minlength=nfrags
+        )
+    elif mol_charge == 0:
+        charges = numpy.zeros(nfrags)
+    else:
+        raise ValueError(
+            "Fragment charges of a charged molecule require Molecule.formal_charges."
+        )
+    if not numpy.isclose(charges.sum(), mol_charge):
+        raise ValueError(
+            f"Formal charges add up to {charges.sum()}, not the molecular charge {mol_charge}."
+        )
+
+    nelectrons = (
+        numpy.bincount(labels, weights=atomic_numbers, minlength=nfrags) - charges
+    )
+    multiplicities = numpy.where(numpy.round(nelectrons) % 2 == 1, 2, 1)
+
+    return {
+        "fragments": fragments,
+        "fragment_charges": charges.tolist(),
+        "fragment_multiplicities": multiplicities.tolist(),
+        # high spin coupling of the fragments, as in qcelemental
+        "molecular_multiplicity": int((multiplicities - 1).sum() + 1),
+        # plain lists, which survive serialization unlike structured arrays
+        "fragment_substructs": [list(name) for name in names[order].tolist()],
+    }
+
+
+def _scale(array: numpy.ndarray, factor: float, copy: bool = True) -> numpy.ndarray:
+    """Returns array * factor. With copy=False and a factor of exactly 1, the input
+    array is returned as is. Otherwise a single new buffer is allocated and scaled
+    in place."""
+    if factor == 1.0 and not copy:
+        return array
+    scaled = numpy.array(array, dtype=float)
+    if factor != 1.0:
+        scaled *= factor
+    return scaled
+
+
+def _with_geometry(
+    qcmol: qcelemental.models.Molecule, geometry: numpy.ndarray
+) -> qcelemental.models.Molecule:
+    """Returns a shallow copy of qcmol with its geometry (in bohr) replaced. All other
+    fields are reused as is and only the geometry shape is checked. The stale
+    molecule hash is dropped from the identifiers."""
+    geometry = numpy.asarray(geometry, dtype=float).reshape(-1, 3)
+    if len(geometry) != len(qcmol.symbols):
+        raise ValueError(
+            f"Geometry has {len(geometry)} atoms, but the molecule has {len(qcmol.symbols)}."
+        )
+    update = {"geometry": geometry}
+    if qcmol.identifiers is not None and qcmol.identifiers.molecule_hash is not None:
+        update["identifiers"] = qcmol.identifiers.copy(update={"molecule_hash": None})
+    return qcmol.copy(update=update)
+
+
+# tolerance (in amu) of masses matching isotope masses, as in qcelemental
+_mass_tol = 1.0e-3
+
+
+def _qcmol_nuclei(
+    qcmol: qcelemental.models.Molecule,
+) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """Returns the atomic numbers, masses and mass numbers of qcmol. Unset (default)
+    values are looked up in the element tables for all atoms at once, instead of
+    atom by atom as qcelemental does on every access."""
+    values = qcmol.__dict__
+    atomic_numbers = values.get("atomic_numbers_")
+    if atomic_numbers is None:
+        atomic_numbers = elements.atomic_numbers(qcmol.symbols)
+    masses = values.get("masses_")
+    if masses is None:
+        masses = elements.masses(atomic_numbers)
+    mass_numbers = values.get("mass_numbers_")
+    if mass_numbers is None:
+        mass_numbers = elements.mass_numbers(atomic_numbers)
+    return atomic_numbers, masses, mass_numbers
+
+
+def _mmol_atomic_numbers(
+    mmol: "mmelemental.models.Molecule",
+) -> Optional[numpy.ndarray]:
+    """Returns the atomic numbers of mmol, or None if its symbols are not elements.
+    Unset atomic numbers are looked up once per distinct symbol, instead of atom by
+    atom as mmelemental does on every access."""
+    atomic_numbers = mmol.__dict__.get("atomic_numbers_")
+    if atomic_numbers is None:
+        try:
+            atomic_numbers = elements.atomic_numbers(mmol.symbols)
+        except qcelemental.exceptions.NotAnElementError:
+            return None
+    return atomic_numbers
+
+
+# MMSchema fields stored in QCSchema extras by MolToQCSchemaComponent
+_extras_fields = ("atom_labels", "fragment_substructs")
+
+# mmelemental stores connectivity as a structured array of (atom1, atom2, order)
+_bond_dtype = numpy.dtype([("f0", "<i8"), ("f1", "<i8"), ("f2", "<f8")])
+
+
+def _connectivity_array(connectivity: Any, natoms: int) -> numpy.ndarray:
+    """Returns connectivity as an (nbonds, 3) float array of (atom1, atom2, order)
+    rows with atom1 <= atom2, stably sorted by atom1 as in qcelemental, which keeps
+    the molecule hashes unchanged. Atom indices and bond orders are validated, and
+    duplicate bonds dropped (the first one is kept), with vectorized operations.
+    connectivity may be a list of tuples, an (nbonds, 3) array, or a structured
+    array as stored by mmelemental."""
+    bonds = numpy.asarray(connectivity)
+    if bonds.dtype.names is not None:
+        bonds = numpy.stack([bonds[name] for name in bonds.dtype.names], axis=-1)
+    bonds = numpy.array(bonds, dtype=float).reshape(-1, 3)
+
+    atoms = bonds[:, :2]
+    if not numpy.all((atoms >= 0) & (atoms < natoms) & (atoms == numpy.floor(atoms))):
+        raise ValueError(
+            f"Connectivity atom indices must be integers in [0, {natoms})."
+        )
+    if not numpy.all((bonds[:, 2] >= 0) & (bonds[:, 2] <= 5)):
+        raise ValueError("Connectivity bond orders must be in [0, 5].")
+
+    atoms.sort(axis=1)  # in place, bonds owns its buffer
+    _, first = numpy.unique(atoms, axis=0, return_index=True)
+    bonds = bonds[numpy.sort(first)]
+    return bonds[numpy.argsort(bonds[:, 0], kind="stable")]
+
+
+def _connectivity_tuples(bonds: numpy.ndarray) -> List[Tuple[int, int, float]]:
+    """Converts an (nbonds, 3) connectivity array to qcelemental's list of tuples."""
+    atoms = bonds[:, :2].astype(int)
+    return list(zip(atoms[:, 0].tolist(), atoms[:, 1].tolist(), bonds[:, 2].tolist()))
+
+
+def _connectivity_struct(bonds: numpy.ndarray) -> numpy.ndarray:
+    """Converts an (nbonds, 3) connectivity array to mmelemental's structured array."""
+    conn = numpy.empty(len(bonds), dtype=_bond_dtype)
+    conn["f0"], conn["f1"], conn["f2"] = bonds[:, 0], bonds[:, 1], bonds[:, 2]
+    return conn
+
+
 class MolToQCSchemaComponent(TacticComponent):
-    """A component for converting MMSchema to QCSchema molecule."""
+    """A component for converting MMSchema to QCSchema molecule.
+
+    By default the QCSchema molecule in TransOutput.data_object owns its
+    geometry. With the "copy" keyword set to False, the MMSchema geometry is
+    passed through without a copy when no unit scaling is needed, so the input
+    and output molecules may share the same array unless qcelemental makes its
+    own copy (it does with validate="full").
+
+    The input molecule is never mutated, so it does not need to be copied
+    defensively before conversion. Extras are shallow-copied only when atom
+    labels are added to them.
+
+    The qcelemental "full" validation makes several molecule-sized temporaries,
+    and compares all atom pairs for overlaps. With the "chunksize" keyword set,
+    the per-atom arrays are validated chunksize atoms at a time instead, so the
+    peak memory stays close to the size of the output molecule. The resulting
+    molecule is the same. See ``mmic_qcschema.profiling.memory`` to measure the
+    peak memory of a conversion.
+
+    With the "fragments" keyword set to True, the MMSchema substructures (e.g.
+    residues) become QCSchema fragments, one per distinct (name, number), which
+    must each be contiguous. The fragment charges are the sums of the formal
+    charges, which are required for a charged molecule, and the fragment
+    multiplicities the lowest consistent ones. The [name, number] of every
+    fragment is kept in extras["fragment_substructs"].
+
+    Explicitly set MMSchema masses are carried over, scaled to atomic mass units,
+    with the mass numbers of their isotopes. Atoms whose masses match no isotope
+    (e.g. average masses) get mass number -1, as in qcelemental, and MMSchema mass
+    numbers (other than -1) that disagree with the masses raise a ValueError.
+    Without masses, qcelemental's defaults are used.
+    """
 
     @classmethod
     def input(cls):
@@ -57,11 +493,159 @@ class MolToQCSchemaComponent(TacticComponent):
         scratch_name: Optional[str] = None,
         timeout: Optional[int] = None,
     ) -> Tuple[bool, TransOutput]:
+        timer = profiling.timer(type(self).__name__)
         if isinstance(inputs, dict):
             inputs = self.input()(**inputs)
+        timer.lap("input")
+
+        keywords = inputs.keywords or {}
+        qmol = self._convert(
+            inputs.schema_object,
+            validate=keywords.get("validate", "full"),
+            copy=keywords.get("copy", True),
+            chunksize=keywords.get("chunksize"),
+            fragments=keywords.get("fragments", False),
+        )
+
+        timer.reset()
+        success = True
+        output = TransOutput(
+            proc_input=inputs,
+            data_object=qmol,
+            data_units=dict(qc_units),
+            success=success,
+            schema_name=inputs.schema_name,
+            schema_version=inputs.schema_version,
+            provenance=_provenance_stamp(),
+        )
+        timer.lap("output")
+        return success, output
+
+    @classmethod
+    def compute_batch(
+        cls,
+        mols: Sequence["mmelemental.models.Molecule"],
+        validate: str = "full",
+        copy: bool = True,
+        chunksize: Optional[int] = None,
+        fragments: bool = False,
+    ) -> List[qcelemental.models.Molecule]:
+        """Converts a sequence of MMSchema molecules to QCSchema molecules.
+        Unlike :meth:`compute`, no intermediate TransInput/TransOutput models are
+        built per molecule.
+        Parameters
+        ----------
+        mols: Sequence[mmelemental.models.Molecule]
+            MMSchema molecules to convert.
+        validate: str, optional
+            Validation level, one of "full", "fast", or "none". See ``validation_levels``.
+        copy: bool, optional
+            If False, geometries that need no unit scaling are passed through without
+            a copy. See the class docstring for the copy semantics.
+        chunksize: int, optional
+            Number of atoms validated at a time with validate="full", which bounds
+            the memory used for validation. See the class docstring.
+        fragments: bool, optional
+            Map the substructures (e.g. residues) to QCSchema fragments. See the
+            class docstring.
+        Returns
+        -------
+        List[qcelemental.models.Molecule]
+            QCSchema molecules in the same order as ``mols``.
+        """
+        return [
+            cls._convert(
+                mmol,
+                validate=validate,
+                copy=copy,
+                chunksize=chunksize,
+                fragments=fragments,
+            )
+            for mmol in mols
+        ]
+
+    @classmethod
+    def compute_trajectory(
+        cls,
+        mmol: "mmelemental.models.Molecule",
+        geometries: numpy.ndarray,
+        geometry_units: Optional[str] = None,
+        validate: str = "full",
+    ) -> List[qcelemental.models.Molecule]:
+        """Converts a trajectory sharing a single topology to QCSchema molecules.
+        The topology (symbols, atomic numbers, charge, connectivity, etc.) is
+        converted and validated once, and each frame only costs the scaling of
+        its geometry. Frame geometries are not validated.
+        Parameters
+        ----------
+        mmol: mmelemental.models.Molecule
+            MMSchema molecule defining the topology. Its geometry is ignored.
+        geometries: numpy.ndarray
+            Frame geometries of shape (nframes, natoms, 3) or (nframes, natoms*3).
+        geometry_units: str, optional
+            Units of geometries. Defaults to mmol.geometry_units.
+        validate: str, optional
+            Validation level of the topology, see ``validation_levels``.
+        Returns
+        -------
+        List[qcelemental.models.Molecule]
+            QCSchema molecules, one per frame.
+        """
+        geometries = numpy.asarray(geometries)
+        natoms = len(mmol.symbols)
+        geo_factor = conversion_factor(geometry_units or mmol.geometry_units, "bohr")
+        # one buffer for all frames, each molecule stores a view into it
+        frames = _scale(geometries, geo_factor).reshape(len(geometries), natoms, 3)
+
+        template = cls._convert(mmol, validate=validate, copy=False)
+        return [_with_geometry(template, frame) for frame in frames]
+
+    @classmethod
+    def update_geometry(
+        cls,
+        qcmol: qcelemental.models.Molecule,
+        geometry: numpy.ndarray,
+        geometry_units: str = "bohr",
+        copy: bool = True,
+    ) -> qcelemental.models.Molecule:
+        """Returns a QCSchema molecule with only its geometry replaced, for repeated
+        conversions of the same molecule e.g. along an optimization or MD run. The
+        already validated symbols, masses, charge, fragments, connectivity, etc. are
+        reused as is, so the cost is that of scaling (or copying) the geometry.
+        Parameters
+        ----------
+        qcmol: qcelemental.models.Molecule
+            QCSchema molecule to update, e.g. a previous conversion output.
+        geometry: numpy.ndarray
+            New geometry of shape (natoms, 3) or (natoms*3,). It is not validated.
+        geometry_units: str, optional
+            Units of geometry. Defaults to bohr.
+        copy: bool, optional
+            If False, a geometry that needs no unit scaling is used without a copy.
+        Returns
+        -------
+        qcelemental.models.Molecule
+            A shallow copy of qcmol with the new geometry.
+        """
+        geo_factor = conversion_factor(geometry_units, "bohr")
+        return _with_geometry(qcmol, _scale(geometry, geo_factor, copy))
+
+    @staticmethod
+    def _convert(
+        mmol: "mmelemental.models.Molecule",
+        validate: str = "full",
+        copy: bool = True,
+        chunksize: Optional[int] = None,
+        fragments: bool = False,
+    ) -> qcelemental.models.Molecule:
+        """Converts a single MMSchema molecule."""
+        if validate not in validation_levels:
+            raise ValueError(
+                f"Validation level must be one of {validation_levels}, not {validate}."
+            )
 
-        mmol = inputs.schema_object
-        if mmol.atomic_numbers is None:
+        atomic_numbers = _mmol_atomic_numbers(mmol)
+        if atomic_numbers is None:
             raise NotImplementedError(
                 "QCSchema supports only atomic molecules. Molecule.atomic_numbers must be defined."
             )
@@ -70,64 +654,110 @@ class MolToQCSchemaComponent(TacticComponent):
             raise NotImplementedError("QCSchema supports only 3D molecules")
 
         assert (
-            inputs.schema_object.schema_version == 1
+            mmol.schema_version == 1
         ), "This converter works only with mmschema_molecule version 1"
 
-        geo_factor = qcelemental.constants.conversion_factor(
-            mmol.geometry_units, "bohr"
-        )
-        coordinates = mmol.geometry * geo_factor
+        timer = profiling.timer("MolToQCSchemaComponent")
+        geo_factor = conversion_factor(mmol.geometry_units, "bohr")
+        coordinates = _scale(mmol.geometry, geo_factor, copy)
 
-        charge_factor = qcelemental.constants.conversion_factor(
+        charge_factor = conversion_factor(
             mmol.molecular_charge_units, "elementary_charge"
         )
         mol_charge = charge_factor * mmol.molecular_charge
-
-        # mass_factor = qcelemental.constants.conversion_factor(
-        #    mmol.masses_units, "atomic_mass_unit"
-        # )
-        # masses = mass_factor * mmol.masses  # ignore masses for now
+        timer.lap("units")
+
+        # only explicitly set masses, Molecule.masses would look up the defaults
+        masses, mass_numbers = mmol.__dict__.get("masses_"), mmol.mass_numbers
+        if masses is not None:
+            mass_factor = conversion_factor(mmol.masses_units, "atomic_mass_unit")
+            masses = _scale(masses, mass_factor, copy)
+            # the mass numbers follow from the masses, -1 for masses matching no
+            # isotope (e.g. average masses), as in qcel. Without validation, qcel
+            # would default them regardless of the masses.
+            matched = elements.match_mass_numbers(atomic_numbers, masses, _mass_tol)
+            if mass_numbers is not None:
+                conflict = (mass_numbers >= 0) & (mass_numbers != matched)
+                if conflict.any():
+                    atom = int(numpy.argmax(conflict))
+                    raise ValueError(
+                        f"Mass {masses[atom]} of atom {atom} does not match its mass number {mass_numbers[atom]}."
+                    )
+            mass_numbers = matched
 
         extras = mmol.extras
 
         # atom_labels in qcel are treated in lower case ... so
-        # we store atom_labels from MMSchema in extras instead
-        if extras is not None:
-            if mmol.atom_labels is not None:
-                extras.update({"atom_labels": mmol.atom_labels})
-        elif mmol.atom_labels is not None:
+        # we store atom_labels from MMSchema in extras instead.
+        # A shallow overlay leaves the input extras untouched.
+        if mmol.atom_labels is not None:
+            extras = {**(extras or {}), "atom_labels": mmol.atom_labels}
+
+        frag_data = {}
+        if fragments and mmol.substructs is not None:
+            frag_data = _substruct_fragments(mmol, atomic_numbers, mol_charge)
+            # substructure names have no QCSchema field
             extras = {
-                "atom_labels": mmol.atom_labels,
-            }  # "masses_mmel": masses}
+                **(extras or {}),
+                "fragment_substructs": frag_data.pop("fragment_substructs"),
+            }
 
         data = {
-            "atomic_numbers": mmol.atomic_numbers,
-            "mass_numbers": mmol.mass_numbers,
+            "atomic_numbers": atomic_numbers,
+            "mass_numbers": mass_numbers,
             "symbols": mmol.symbols,
             "geometry": coordinates,
             "molecular_charge": mol_charge,
             "comment": mmol.comment,
             "identifiers": mmol.identifiers,
             "extras": extras,
+            **frag_data,
         }
+        if masses is not None:  # qcel validates masses even when None
+            data["masses"] = masses
 
+        bonds = None
         if mmol.connectivity is not None:
-            data["connectivity"] = mmol.connectivity
+            bonds = _connectivity_array(mmol.connectivity, len(mmol.symbols))
+        timer.lap("extras")
 
-        qmol = qcelemental.models.Molecule(**data, validate=True, nonphysical=False)
-        success = True
-        return success, TransOutput(
-            proc_input=inputs,
-            data_object=qmol,
-            success=success,
-            schema_name=inputs.schema_name,
-            schema_version=inputs.schema_version,
-            provenance=provenance_stamp,
-        )
+        if validate == "full" and chunksize:
+            # the scaled geometry is a copy unless it is the input array itself
+            fields = _validate_chunked(
+                data, chunksize, inplace=coordinates is not mmol.geometry
+            )
+            qmol = qcelemental.models.Molecule(**fields, validate=False)
+        elif validate == "full":
+            qmol = qcelemental.models.Molecule(**data, validate=True, nonphysical=False)
+        elif validate == "fast":
+            qmol = qcelemental.models.Molecule(**data, validate=False)
+        else:
+            qmol = _construct_qcmol(data)
+
+        if bonds is not None:
+            # already validated above, so qcelemental's per-bond validation is skipped
+            qmol = qmol.copy(update={"connectivity_": _connectivity_tuples(bonds)})
+        timer.lap("molecule")
+
+        return qmol
 
 
 class QCSchemaToMolComponent(TacticComponent):
-    """A component for converting ParmEd molecule to Molecule object."""
+    """A component for converting ParmEd molecule to Molecule object.
+
+    The MMSchema molecule in TransOutput.schema_object never shares its geometry
+    with the input since mmelemental stores a flattened copy. With the "copy"
+    keyword set to False, the conversion itself makes at most one temporary copy
+    of the geometry and masses, and none when no unit scaling is needed.
+
+    The input molecule is never mutated. Atom labels stored in its extras are
+    left in place and dropped from a shallow copy of the extras instead.
+
+    Explicitly set QCSchema fragments become MMSchema substructures, named after
+    extras["fragment_substructs"] if present (see MolToQCSchemaComponent), or
+    ("FRAG", fragment index) otherwise. See :meth:`split_fragments` to split a
+    molecule into one MMSchema molecule per fragment instead.
+    """
 
     @classmethod
     def input(cls):
@@ -165,42 +795,198 @@ class QCSchemaToMolComponent(TacticComponent):
         timeout: Optional[int] = None,
     ) -> Tuple[bool, TransOutput]:
 
+        timer = profiling.timer(type(self).__name__)
         if isinstance(inputs, dict):
             inputs = self.input()(**inputs)
-
-        assert (
-            inputs.data_object.schema_version == 2
-        ), "This converter works only with qcschema_molecule version 2"
+        timer.lap("input")
 
         qcmol = inputs.data_object
+        keywords = inputs.keywords or {}
+        mmol = self._convert(qcmol, copy=keywords.get("copy", True))
+
+        timer.reset()
+        success = True
+        output = TransOutput(
+            proc_input=inputs,
+            success=success,
+            schema_name=inputs.schema_name,
+            schema_version=inputs.schema_version,
+            schema_object=mmol,
+            provenance=_provenance_stamp(),
+        )
+        timer.lap("output")
+        return success, output
 
+    @classmethod
+    def compute_batch(
+        cls, mols: Sequence[qcelemental.models.Molecule], copy: bool = True
+    ) -> List["mmelemental.models.Molecule"]:
+        """Converts a sequence of QCSchema molecules to MMSchema molecules.
+        Unlike :meth:`compute`, no intermediate TransInput/TransOutput models are
+        built per molecule, and the MMSchema default units are looked up once
+        per batch.
+        Parameters
+        ----------
+        mols: Sequence[qcelemental.models.Molecule]
+            QCSchema molecules to convert.
+        copy: bool, optional
+            If False, avoids temporary copies of arrays that need no unit scaling.
+        Returns
+        -------
+        List[mmelemental.models.Molecule]
+            MMSchema molecules in the same order as ``mols``.
+        """
+        mm_units = mmelemental.models.Molecule.default_units
+        return [cls._convert(qcmol, mm_units, copy) for qcmol in mols]
+
+    @classmethod
+    def split_fragments(
+        cls, qcmol: qcelemental.models.Molecule, validate: bool = False
+    ) -> List["mmelemental.models.Molecule"]:
+        """Splits a QCSchema molecule into one MMSchema molecule per fragment, e.g. a
+        cluster into its monomers. The per-atom arrays are reordered by fragment and
+        unit scaled once for the whole molecule, and every fragment molecule stores
+        slices (views) of them. Bonds between fragments are dropped.
+        Parameters
+        ----------
+        qcmol: qcelemental.models.Molecule
+            QCSchema molecule to split.
+        validate: bool, optional
+            Validate every fragment molecule with mmelemental. By default they are
+            constructed without validation since qcmol is already valid, and their
+            hash field is left unset (get_hash still works).
+        Returns
+        -------
+        List[mmelemental.models.Molecule]
+            MMSchema molecules, one per fragment, with the fragment charges as their
+            molecular charges.
+        """
         mm_units = mmelemental.models.Molecule.default_units
-        geo_factor = qcelemental.constants.conversion_factor(
-            "bohr", mm_units["geometry_units"]
+        geo_factor = conversion_factor("bohr", mm_units["geometry_units"])
+        charge_factor = conversion_factor(
+            "elementary_charge", mm_units["molecular_charge_units"]
         )
-        coordinates = qcmol.geometry.flatten() * geo_factor
+        mass_factor = conversion_factor("atomic_mass_unit", mm_units["masses_units"])
+
+        fragments = qcmol.fragments
+        natoms, nfrags = len(qcmol.symbols), len(fragments)
+        lengths = numpy.array([len(frag) for frag in fragments], dtype=int)
+        bounds = numpy.concatenate([[0], numpy.cumsum(lengths)])
+        order = numpy.concatenate(fragments)
+        # contiguous fragments need no reordering, slices are views
+        index = slice(None) if numpy.array_equal(order, numpy.arange(natoms)) else order
+
+        atomic_numbers, masses, mass_numbers = _qcmol_nuclei(qcmol)
+        columns = {
+            "symbols": qcmol.symbols[index],
+            "atomic_numbers": numpy.asarray(atomic_numbers[index], dtype=int),
+            "geometry": _scale(qcmol.geometry[index], geo_factor),
+            "masses": _scale(masses[index], mass_factor),
+            "substructs": numpy.repeat(_fragment_names(qcmol), lengths),
+        }
+        if (mass_numbers > 0).all():
+            columns["mass_numbers"] = mass_numbers[index]
+        if qcmol.extras is not None and qcmol.extras.get("atom_labels") is not None:
+            columns["atom_labels"] = numpy.asarray(qcmol.extras["atom_labels"])[index]
+        charges = numpy.zeros(nfrags)
+        if len(qcmol.fragment_charges) == nfrags:  # unless qcmol was not validated
+            charges = charge_factor * numpy.asarray(qcmol.fragment_charges, dtype=float)
+
+        # fragment index of every (reordered) atom
+        atom_frags = numpy.repeat(numpy.arange(nfrags), lengths)
+        bonds, bond_bounds = None, None
+        if qcmol.connectivity is not None:
+            conn = _connectivity_array(qcmol.connectivity, natoms)
+            position = numpy.empty(natoms, dtype=int)
+            position[order] = numpy.arange(natoms)
+            atoms = position[conn[:, :2].astype(int)]
+            labels = atom_frags[atoms]
+            inner = labels[:, 0] == labels[:, 1]
+            conn, atoms, labels = conn[inner], atoms[inner], labels[inner, 0]
+            conn[:, :2] = numpy.sort(atoms - bounds[labels][:, None], axis=1)
+
+            sort = numpy.argsort(labels, kind="stable")
+            bonds = _connectivity_struct(conn[sort])
+            bond_bounds = numpy.concatenate(
+                [[0], numpy.cumsum(numpy.bincount(labels, minlength=nfrags))]
+            ).tolist()
+
+        if validate:
+            build = mmelemental.models.Molecule
+        else:
+            # names are set by mmelemental when validating
+            names = _fragment_formulas(columns["symbols"], atom_frags, nfrags)
+            # copies of a template skip the per-molecule defaults of construct
+            template = mmelemental.models.Molecule.construct()
+            names_by_alias = {
+                field.alias: name
+                for name, field in mmelemental.models.Molecule.__fields__.items()
+            }
+
+            def build(**fields):
+                update = {names_by_alias[key]: val for key, val in fields.items()}
+                return template.copy(update=update)
+
+        bounds, charges = bounds.tolist(), charges.tolist()
+        mols = []
+        for frag in range(nfrags):
+            start, end = bounds[frag], bounds[frag + 1]
+            fields = {key: val[start:end] for key, val in columns.items()}
+            fields["geometry"] = fields["geometry"].reshape(-1)
+            fields["molecular_charge"] = charges[frag]
+            if bonds is not None and bond_bounds[frag] < bond_bounds[frag + 1]:
+                fields["connectivity"] = bonds[
+                    bond_bounds[frag] : bond_bounds[frag + 1]
+                ]
+            if not validate:
+                fields["name"] = names[frag]
+            mols.append(build(**fields))
+
+        return mols
+
+    @staticmethod
+    def _convert(
+        qcmol: qcelemental.models.Molecule,
+        mm_units: Optional[Dict[str, str]] = None,
+        copy: bool = True,
+    ) -> "mmelemental.models.Molecule":
+        """Converts a single QCSchema molecule. ``mm_units`` are the MMSchema default
+        units, which can be looked up once and shared between calls."""
+        assert (
+            qcmol.schema_version == 2
+        ), "This converter works only with qcschema_molecule version 2"
+
+        timer = profiling.timer("QCSchemaToMolComponent")
+        if mm_units is None:
+            mm_units = mmelemental.models.Molecule.default_units
 
-        charge_factor = qcelemental.constants.conversion_factor(
+        geo_factor = conversion_factor("bohr", mm_units["geometry_units"])
+        # reshape returns a view of the (natom, 3) geometry, unlike flatten
+        coordinates = _scale(qcmol.geometry.reshape(-1), geo_factor, copy)
+
+        charge_factor = conversion_factor(
             "elementary_charge", mm_units["molecular_charge_units"]
         )
         mol_charge = charge_factor * qcmol.molecular_charge
 
-        mass_factor = qcelemental.constants.conversion_factor(
-            "atomic_mass_unit", mm_units["masses_units"]
-        )
-        masses = mass_factor * qcmol.masses
+        mass_factor = conversion_factor("atomic_mass_unit", mm_units["masses_units"])
+        atomic_numbers, masses, mass_numbers = _qcmol_nuclei(qcmol)
+        masses = _scale(masses, mass_factor, copy)
+        timer.lap("units")
 
         # since qcel treats atom_labels in lower case, we get
-        # them instead from extras
-        if qcmol.extras is not None:
-            atom_labels = qcmol.extras.pop("atom_labels", None)
-        else:
-            atom_labels = None
+        # them instead from extras, without popping them from the input
+        extras, atom_labels = qcmol.extras, None
+        if extras is not None and not extras.keys().isdisjoint(_extras_fields):
+            atom_labels = extras.get("atom_labels")
+            extras = {
+                key: val for key, val in extras.items() if key not in _extras_fields
+            }
 
         input_dict = {
-            "atomic_numbers": qcmol.atomic_numbers,
-            "mass_numbers": qcmol.mass_numbers
-            if all(qcmol.mass_numbers > 0)
+            "atomic_numbers": atomic_numbers,
+            "mass_numbers": mass_numbers
+            if (mass_numbers > 0).all()
             else None,  # qcel can return mass_number = -1, which likely means
             # the masses are inconsistent with the mass_numbers
             "symbols": qcmol.symbols,
@@ -210,18 +996,21 @@ class QCSchemaToMolComponent(TacticComponent):
             "atom_labels": atom_labels,
             "comment": qcmol.comment,
             "identifiers": qcmol.identifiers,
-            "extras": qcmol.extras,
+            "extras": extras,
         }
 
         if qcmol.connectivity is not None:
-            input_dict["connectivity"] = qcmol.connectivity
+            input_dict["connectivity"] = _connectivity_struct(
+                _connectivity_array(qcmol.connectivity, len(qcmol.symbols))
+            )
 
-        success = True
-        return success, TransOutput(
-            proc_input=inputs,
-            success=success,
-            schema_name=inputs.schema_name,
-            schema_version=inputs.schema_version,
-            schema_object=mmelemental.models.Molecule(**input_dict),
-            provenance=provenance_stamp,
-        )
+        # fragments default to a single one when not set
+        if qcmol.__dict__.get("fragments_") is not None:
+            labels = _fragment_labels(qcmol.fragments, len(qcmol.symbols))
+            input_dict["substructs"] = _fragment_names(qcmol)[labels]
+        timer.lap("extras")
+
+        mmol = mmelemental.models.Molecule(**input_dict)
+        timer.lap("molecule")
+
+        return mmol
@@ -0,0 +1,79 @@
+"""
+compression.py
+Transparent (de)compression of molecule files, e.g. mol.json.gz or mol.msgpack.zst.
+
+Files are read and written through streaming file objects, so the compressed
+data never has to be staged in a temporary file.
+"""
+from typing import IO, Optional, Tuple
+import bz2
+import gzip
+import lzma
+import os
+
+from .mmic_qcschema import compression_ext_maps
+
+__all__ = ["open_file", "split_ext"]
+
+# Standard library codecs: (open function, compression level keyword)
+_openers = {
+    "gzip": (gzip.open, "compresslevel"),
+    "bz2": (bz2.open, "compresslevel"),
+    "lzma": (lzma.open, "preset"),
+}
+
+
+def split_ext(filename: str) -> Tuple[str, Optional[str]]:
+    """Returns the molecule file extension and the compression codec (or None) of
+    filename e.g. "mol.json.gz" -> (".json", "gzip")."""
+    base, ext = os.path.splitext(filename)
+    codec = compression_ext_maps.get(ext)
+    if codec is not None:
+        ext = os.path.splitext(base)[1]
+    return ext, codec
+
+
+def open_file(
+    filename: str,
+    mode: str = "rb",
+    codec: Optional[str] = None,
+    level: Optional[int] = None,
+) -> IO:
+    """Opens filename for streaming, (de)compressing with codec if supplied.
+    Parameters
+    ----------
+    filename: str
+        The filename to open
+    mode: str, optional
+        File mode e.g. "rb", "wb", "rt", or "wt"
+    codec: str, optional
+        One of the codecs in compression_ext_maps i.e. "gzip", "bz2", "lzma", or
+        "zstd". zstd requires the zstandard package.
+    level: int, optional
+        Compression level. Defaults to the codec default.
+    Returns
+    -------
+    IO
+        File object.
+    """
+    writing = mode.startswith(("w", "a", "x"))
+    if codec is None:
+        return open(filename, mode)
+    elif codec in _openers:
+        opener, level_kwarg = _openers[codec]
+        kwargs = {level_kwarg: level} if writing and level is not None else {}
+        return opener(filename, mode, **kwargs)
+    elif codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ModuleNotFoundError(
+                "zstandard is required for zstd compression. Install via `pip install zstandard`."
+            )
+
+        kwargs = {}
+        if writing and level is not None:
+            kwargs["cctx"] = zstandard.ZstdCompressor(level=level)
+        return zstandard.open(filename, mode, **kwargs)
+
+    raise KeyError(f"Compression codec {codec} not understood.")
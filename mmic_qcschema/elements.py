@@ -0,0 +1,169 @@
+"""
+elements.py
+Element and isotope lookup tables for vectorized mass handling.
+
+qcelemental.periodictable resolves every atom through a chain of dictionary
+lookups, e.g. Molecule.masses calls periodictable.to_mass once per atom when
+the masses are not set explicitly. The tables here are built once per process
+from the same data and indexed with whole arrays of atomic (and mass) numbers.
+"""
+import functools
+from typing import NamedTuple, Optional
+import numpy
+import qcelemental
+
+__all__ = [
+    "atomic_numbers",
+    "mass_numbers",
+    "masses",
+    "match_mass_numbers",
+    "preload",
+]
+
+
+class _Tables(NamedTuple):
+    # most abundant isotope of every element, indexed by atomic number
+    mass_numbers: numpy.ndarray
+    masses: numpy.ndarray
+    # (atomic number, mass number) -> isotope mass, nan for unknown isotopes
+    isotope_masses: numpy.ndarray
+
+
+@functools.lru_cache(maxsize=None)
+def _tables() -> _Tables:
+    table = qcelemental.periodictable
+    symbols = [table._z2el[z] for z in range(max(table._z2el) + 1)]
+    max_mass_number = max(max(isotopes) for isotopes in table._el2a2mass.values())
+
+    isotope_masses = numpy.full((len(symbols), max_mass_number + 1), numpy.nan)
+    for z, symbol in enumerate(symbols):
+        for mass_number, mass in table._el2a2mass[symbol].items():
+            isotope_masses[z, mass_number] = mass
+
+    return _Tables(
+        mass_numbers=numpy.array([table._eliso2a[symbol] for symbol in symbols]),
+        masses=numpy.array([float(table._eliso2mass[symbol]) for symbol in symbols]),
+        isotope_masses=isotope_masses,
+    )
+
+
+def _atomic_numbers(atomic_numbers: numpy.ndarray) -> numpy.ndarray:
+    atomic_numbers = numpy.asarray(atomic_numbers, dtype=int)
+    nelements = len(_tables().masses)
+    if atomic_numbers.size and not (
+        0 <= atomic_numbers.min() and atomic_numbers.max() < nelements
+    ):
+        raise ValueError(f"Atomic numbers must be in [0, {nelements}).")
+    return atomic_numbers
+
+
+def atomic_numbers(symbols: numpy.ndarray) -> numpy.ndarray:
+    """Returns the atomic numbers of element symbols. Every distinct symbol is
+    resolved once, however many atoms share it.
+    Parameters
+    ----------
+    symbols: numpy.ndarray
+        Element symbols, case insensitive.
+    Returns
+    -------
+    numpy.ndarray
+        Atomic numbers, one per symbol.
+    """
+    unique, inverse = numpy.unique(numpy.asarray(symbols), return_inverse=True)
+    numbers = numpy.array(
+        [qcelemental.periodictable.to_Z(symbol) for symbol in unique.tolist()],
+        dtype=int,
+    )
+    return numbers[inverse.reshape(-1)]
+
+
+def mass_numbers(atomic_numbers: numpy.ndarray) -> numpy.ndarray:
+    """Returns the mass numbers of the most abundant isotopes, the default mass
+    numbers of qcelemental.
+    Parameters
+    ----------
+    atomic_numbers: numpy.ndarray
+        Atomic numbers.
+    Returns
+    -------
+    numpy.ndarray
+        Mass numbers, one per atom.
+    """
+    return _tables().mass_numbers[_atomic_numbers(atomic_numbers)]
+
+
+def masses(
+    atomic_numbers: numpy.ndarray, mass_numbers: Optional[numpy.ndarray] = None
+) -> numpy.ndarray:
+    """Returns atomic masses in atomic mass units.
+    Parameters
+    ----------
+    atomic_numbers: numpy.ndarray
+        Atomic numbers.
+    mass_numbers: numpy.ndarray, optional
+        Mass numbers of the isotopes. Defaults to the most abundant isotopes, the
+        default masses of qcelemental.
+    Returns
+    -------
+    numpy.ndarray
+        Masses, one per atom.
+    """
+    tables = _tables()
+    atomic_numbers = _atomic_numbers(atomic_numbers)
+    if mass_numbers is None:
+        return tables.masses[atomic_numbers]
+
+    mass_numbers = numpy.asarray(mass_numbers, dtype=int)
+    isotope_masses = numpy.full(len(atomic_numbers), numpy.nan)
+    known = (0 <= mass_numbers) & (mass_numbers < tables.isotope_masses.shape[1])
+    isotope_masses[known] = tables.isotope_masses[
+        atomic_numbers[known], mass_numbers[known]
+    ]
+    unknown = numpy.isnan(isotope_masses)
+    if unknown.any():
+        atom = int(numpy.argmax(unknown))
+        raise ValueError(
+            f"Unknown isotope with atomic number {atomic_numbers[atom]} and mass number {mass_numbers[atom]}."
+        )
+    return isotope_masses
+
+
+def match_mass_numbers(
+    atomic_numbers: numpy.ndarray, masses: numpy.ndarray, tol: float = 1.0e-3
+) -> numpy.ndarray:
+    """Returns the mass numbers of the isotopes matching masses, as qcelemental does
+    when validating masses without mass numbers.
+    Parameters
+    ----------
+    atomic_numbers: numpy.ndarray
+        Atomic numbers.
+    masses: numpy.ndarray
+        Masses in atomic mass units.
+    tol: float, optional
+        Largest difference (in amu) between a mass and its isotope mass.
+    Returns
+    -------
+    numpy.ndarray
+        Mass numbers, one per atom, or -1 for masses matching no isotope (e.g.
+        average masses).
+    """
+    tables = _tables()
+    atomic_numbers = _atomic_numbers(atomic_numbers)
+    masses = numpy.asarray(masses, dtype=float)
+    # isotope masses are within 0.5 of their mass numbers
+    mass_numbers = numpy.rint(masses).astype(int)
+    known = (0 <= mass_numbers) & (mass_numbers < tables.isotope_masses.shape[1])
+    matched = numpy.zeros(len(masses), dtype=bool)
+    matched[known] = (
+        numpy.abs(
+            tables.isotope_masses[atomic_numbers[known], mass_numbers[known]]
+            - masses[known]
+        )
+        < tol
+    )  # nan for unknown isotopes compares False
+    return numpy.where(matched, mass_numbers, -1)
+
+
+def preload():
+    """Builds the lookup tables ahead of time, e.g. before timing conversions."""
+    _tables()
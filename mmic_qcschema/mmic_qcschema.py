@@ -4,21 +4,144 @@ MMSchema to/from QCSchema converter
 
 Handles the primary functions
 """
+import functools
+import json
+import os
 
 
 # Handle versioneer
-from ._version import get_versions
+# In a git checkout, versioneer spawns git subprocesses to compute the version,
+# so the version is resolved on first access of __version__ rather than on
+# import, only once per process, and memoized on disk across processes.
+@functools.lru_cache(maxsize=None)
+def _get_versions():
+    from . import _version
 
-versions = get_versions()
-__version__ = versions["version"]
-__git_revision__ = versions["full-revisionid"]
-del get_versions, versions
+    # sdists and builds ship a static _version.py, with the version and revision
+    # baked in at build time, which is cheap to read
+    if hasattr(_version, "version_json"):
+        return _version.get_versions()
+
+    try:
+        # Version in the installed distribution metadata (python >= 3.8)
+        from importlib.metadata import distribution, PackageNotFoundError
+
+        try:
+            dist = distribution("mmic_qcschema")
+        except PackageNotFoundError:
+            dist = None
+        # only if it describes this copy, not one shadowed by e.g. a checkout on PYTHONPATH
+        if dist is not None and os.path.realpath(
+            dist.locate_file(os.path.join("mmic_qcschema", "mmic_qcschema.py"))
+        ) == os.path.realpath(__file__):
+            return {"version": dist.version, "full-revisionid": None}
+    except ImportError:
+        pass
+
+    return _git_versions(_version)
+
+
+# Memo of the version of a git checkout, kept in its .git directory
+_version_memo = "mmic_qcschema_version.json"
+
+
+def _git_state(gitdir: str) -> list:
+    """Returns the state of a git checkout that its version is computed from: the
+    checked out ref, and the modification times of the ref, tags and index. Edits
+    of the working tree alone do not change it, so the "dirty" flag of a memoized
+    version is only updated along with the index."""
+    with open(os.path.join(gitdir, "HEAD")) as fp:
+        head = fp.read().strip()
+    paths = ["HEAD", "packed-refs", os.path.join("refs", "tags"), "index"]
+    if head.startswith("ref: "):
+        paths.append(head[len("ref: ") :])
+
+    state = [head]
+    for path in paths:
+        try:
+            state.append(os.stat(os.path.join(gitdir, path)).st_mtime_ns)
+        except FileNotFoundError:
+            state.append(None)
+    return state
+
+
+def _git_versions(_version):
+    """Returns the versioneer version of a git checkout, memoized on disk so that
+    only the first process after e.g. a commit or checkout spawns git."""
+    root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    gitdir = os.path.join(root, ".git")
+    try:
+        state = _git_state(gitdir)
+    except OSError:  # not a git checkout, or e.g. a worktree with a .git file
+        return _version.get_versions()
+
+    memo = os.path.join(gitdir, _version_memo)
+    try:
+        with open(memo) as fp:
+            cached = json.load(fp)
+        if cached["state"] == state:
+            return cached["versions"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    versions = _version.get_versions()
+    if versions.get("error") is None:
+        # written atomically, since several processes may race to write it
+        tmp = f"{memo}.{os.getpid()}"
+        try:
+            with open(tmp, "w") as fp:
+                json.dump({"state": state, "versions": versions}, fp)
+            os.replace(tmp, memo)
+        except OSError:
+            pass
+    return versions
+
+
+def __getattr__(name):
+    if name == "__version__":
+        return _get_versions()["version"]
+    elif name == "__git_revision__":
+        return _get_versions()["full-revisionid"]
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 molread_ext_maps = {
     ".xyz": "xyz",
     ".json": "json",
     ".msgpack": "msgpack",
+    ".qcmm": "qcmm",
+}
+
+molwrite_ext_maps = {
+    ".xyz": "xyz",
+    ".json": "json",
+    ".msgpack": "msgpack",
+    ".qcmm": "qcmm",
 }
 
-molwrite_ext_maps = {".xyz": "xyz", ".json": "json", ".msgpack": "msgpack"}
+# Compression codecs by (trailing) file extension e.g. mol.json.gz
+compression_ext_maps = {".gz": "gzip", ".bz2": "bz2", ".xz": "lzma", ".zst": "zstd"}
+
+# Encodings of molecules serialized by mmic_qcschema.parallel and mmic_qcschema.cache.
+# mmelemental cannot read back its structured arrays (connectivity, substructs) from
+# "-ext" encodings, so MMSchema molecules are serialized as JSON.
+serialization_encodings = {"qcschema": "msgpack-ext", "mmschema": "json"}
+
+
+def _parse_mol(blob: bytes, schema: str):
+    """Rebuilds a molecule serialized with serialization_encodings[schema]. QCSchema
+    molecules are not validated again since they were converted (and validated to
+    the requested level) before serialization."""
+    encoding = serialization_encodings[schema]
+    if schema == "qcschema":
+        import qcelemental
+        from qcelemental.util import deserialize
+
+        return qcelemental.models.Molecule(
+            **deserialize(blob, encoding), validate=False
+        )
+
+    import mmelemental
+
+    return mmelemental.models.Molecule.parse_raw(blob, encoding=encoding)
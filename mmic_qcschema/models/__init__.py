@@ -1,4 +1,5 @@
 from .mol import *
-from . import mol
+from .dataset import *
+from . import mol, dataset
 
-__all__ = mol.__all__
+__all__ = mol.__all__ + dataset.__all__
@@ -0,0 +1,188 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+import json
+import os
+import numpy
+import qcelemental
+from qcelemental.util.serialization import json_dumps
+
+from mmic_qcschema.components.mol_component import _connectivity_tuples
+from mmic_qcschema.qcmm import _array_fields
+from .mol import QCSchemaMol
+
+__all__ = ["QCSchemaDataset"]
+
+_index_file = "index.json"
+_format_version = 1
+
+
+class QCSchemaDataset:
+    """A columnar store of many QCSchema molecules.
+
+    A dataset is a directory holding one .npy file per per-atom field, with the
+    fields of all molecules concatenated, and a JSON index storing the atom (and
+    bond) offsets of every molecule along with its remaining (scalar) fields.
+    The columns are memory-mapped on open, so reading a molecule by position or
+    key is O(1) and only touches the pages of that molecule.
+
+    >>> QCSchemaDataset.write("waters", mols, keys=names)
+    >>> dataset = QCSchemaDataset.open("waters")
+    >>> dataset[0], dataset["water_42"], dataset[10:20]
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, numpy.ndarray],
+        fields: List[Dict[str, Any]],
+        keys: Optional[List[str]] = None,
+    ):
+        self.columns = columns
+        self.fields = fields
+        self.keys = keys
+        self._positions = (
+            {key: pos for pos, key in enumerate(keys)} if keys is not None else None
+        )
+
+    @classmethod
+    def open(cls, path: str, mmap: bool = True) -> "QCSchemaDataset":
+        """Opens a dataset written with :meth:`write`.
+        Parameters
+        ----------
+        path: str
+            Dataset directory.
+        mmap: bool, optional
+            Memory-map the columns (read-only) instead of reading them into memory.
+        Returns
+        -------
+        QCSchemaDataset
+            The opened dataset.
+        """
+        with open(os.path.join(path, _index_file)) as fp:
+            index = json.load(fp)
+        if index["format_version"] > _format_version:
+            raise ValueError(
+                f"Dataset format version {index['format_version']} is newer than supported ({_format_version})."
+            )
+
+        columns = {
+            key: numpy.load(
+                os.path.join(path, key + ".npy"), mmap_mode="r" if mmap else None
+            )
+            for key in index["columns"]
+        }
+        return cls(columns, index["fields"], index["keys"])
+
+    @classmethod
+    def write(
+        cls,
+        path: str,
+        mols: Sequence[Union[QCSchemaMol, qcelemental.models.Molecule]],
+        keys: Optional[Sequence[str]] = None,
+    ) -> "QCSchemaDataset":
+        """Writes molecules to a new dataset in bulk.
+        Parameters
+        ----------
+        path: str
+            Dataset directory, created if it does not exist.
+        mols: Sequence[QCSchemaMol or qcelemental.models.Molecule]
+            Molecules to store, in order.
+        keys: Sequence[str], optional
+            Unique key of every molecule for lookups by key.
+        Returns
+        -------
+        QCSchemaDataset
+            The written dataset, read back in memory-mapped mode.
+        """
+        if keys is not None:
+            keys = list(keys)
+            if len(keys) != len(mols):
+                raise ValueError(
+                    f"Number of keys ({len(keys)}) does not match number of molecules ({len(mols)})."
+                )
+            if len(set(keys)) != len(keys):
+                raise ValueError("Dataset keys must be unique.")
+
+        fields = [
+            (mol.data if isinstance(mol, QCSchemaMol) else mol).dict() for mol in mols
+        ]
+        # fields present in every molecule are stored as columns, the rest stay per molecule
+        stored = [
+            key
+            for key in sorted(_array_fields)
+            if fields and all(field.get(key) is not None for field in fields)
+        ]
+
+        columns = {}
+        for key in stored:
+            values = [field.pop(key) for field in fields]
+            if key == "connectivity":
+                values = [
+                    numpy.array(bonds, dtype=float).reshape(-1, 3) for bonds in values
+                ]
+            columns[key] = numpy.concatenate(values)
+            if key == "symbols":
+                columns["offsets"] = numpy.cumsum(
+                    [0] + [len(value) for value in values]
+                )
+            elif key == "connectivity":
+                columns["bond_offsets"] = numpy.cumsum(
+                    [0] + [len(value) for value in values]
+                )
+
+        if "symbols" not in columns:
+            raise ValueError("Cannot write a dataset of molecules without symbols.")
+
+        os.makedirs(path, exist_ok=True)
+        for key, value in columns.items():
+            numpy.save(os.path.join(path, key + ".npy"), value)
+
+        index = {
+            "format_version": _format_version,
+            "columns": list(columns),
+            "keys": keys,
+            "fields": fields,
+        }
+        with open(os.path.join(path, _index_file), "w") as fp:
+            fp.write(json_dumps(index))
+
+        return cls.open(path)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def __iter__(self) -> Iterator[QCSchemaMol]:
+        for pos in range(len(self)):
+            yield self._get(pos)
+
+    def __contains__(self, key: str) -> bool:
+        return self._positions is not None and key in self._positions
+
+    def __getitem__(
+        self, item: Union[int, str, slice]
+    ) -> Union[QCSchemaMol, List[QCSchemaMol]]:
+        if isinstance(item, slice):
+            return [self._get(pos) for pos in range(*item.indices(len(self)))]
+        if isinstance(item, str):
+            if item not in self:
+                raise KeyError(item)
+            return self._get(self._positions[item])
+
+        pos = item + len(self) if item < 0 else item
+        if not 0 <= pos < len(self):
+            raise IndexError(f"Dataset index {item} out of range.")
+        return self._get(pos)
+
+    def _get(self, pos: int) -> QCSchemaMol:
+        fields = dict(self.fields[pos])
+        start, end = self.columns["offsets"][pos : pos + 2]
+        for key, value in self.columns.items():
+            if key in _array_fields and key != "connectivity":
+                fields[key] = value[start:end]
+
+        qcmol = qcelemental.models.Molecule(**fields, validate=False)
+        if "connectivity" in self.columns:
+            start, end = self.columns["bond_offsets"][pos : pos + 2]
+            # attached as is, pydantic would validate the bonds one by one
+            bonds = self.columns["connectivity"][start:end]
+            qcmol = qcmol.copy(update={"connectivity_": _connectivity_tuples(bonds)})
+
+        return QCSchemaMol(data=qcmol)
@@ -1,13 +1,23 @@
-from typing import Dict, Any, Optional
+from typing import IO, Dict, Any, Iterator, List, Optional, Sequence, Union
+from concurrent.futures import Executor
 from mmic_translator.models.base import ToolkitModel
 from mmelemental.models import Molecule
 import qcelemental
+from qcelemental.util.serialization import jsonext_loads, msgpackext_loads
+import asyncio
+import functools
+import itertools
 
 # QCElemental converter components
 from mmic_qcschema.components.mol_component import (
     QCSchemaToMolComponent,
     MolToQCSchemaComponent,
 )
+from mmic_qcschema.mmic_qcschema import molread_ext_maps, molwrite_ext_maps
+from mmic_qcschema.qcmm import read_qcmm, write_qcmm
+from mmic_qcschema.compression import open_file, split_ext
+from mmic_qcschema.cache import ConversionCache, DiskConversionCache, content_hash
+from mmic_qcschema.units import qc_units
 
 __all__ = ["QCSchemaMol"]
 
@@ -50,6 +60,11 @@ class QCSchemaMol(ToolkitModel):
             The molecule geometry filename to read
         top_filename: str, optional
             The topology i.e. connectivity filename to read
+        dtype: str, optional
+            File format. Inferred from the file extension if not supplied. The
+            "qcmm" binary format is memory-mapped, see ``mmic_qcschema.qcmm``.
+            Files with a compression extension in compression_ext_maps e.g.
+            mol.json.gz are decompressed on the fly.
         **kwargs
             Any additional keywords to pass to the constructor
         Returns
@@ -61,12 +76,76 @@ class QCSchemaMol(ToolkitModel):
             raise NotImplementedError(
                 "Topology/connectivity files not supported in QCElemental."
             )
-        mol = qcelemental.models.Molecule.from_file(filename, dtype, **kwargs)
+        ext, codec = split_ext(filename)
+        if dtype is None:
+            dtype = molread_ext_maps.get(ext)
+
+        if dtype == "qcmm":
+            if codec is not None:
+                raise NotImplementedError(
+                    "Compressed qcmm files cannot be memory-mapped."
+                )
+            mol = read_qcmm(filename, **kwargs)
+        elif codec is not None:
+            mol = _read_compressed(filename, dtype, codec, **kwargs)
+        else:
+            mol = qcelemental.models.Molecule.from_file(filename, dtype, **kwargs)
         return cls(data=mol)
 
+    @classmethod
+    def iter_file(
+        cls, filename: str, dtype: Optional[str] = None, **kwargs
+    ) -> Iterator["QCSchemaMol"]:
+        """
+        Lazily reads a multi-frame (concatenated) xyz file one frame at a time.
+        Only the current frame is held in memory.
+
+        Parameters
+        ----------
+        filename : str
+            The multi-frame geometry filename to read
+        dtype: str, optional
+            File format. Only "xyz" is supported.
+        **kwargs
+            Any additional keywords to pass to the constructor
+        Returns
+        -------
+        Iterator[QCSchemaMol]
+            A generator of QCSchemaMol objects, one per frame.
+        """
+        ext, codec = split_ext(filename)
+        if dtype is None:
+            dtype = molread_ext_maps.get(ext)
+
+        if dtype != "xyz":
+            raise NotImplementedError(
+                f"Only xyz files can be read frame by frame, not {dtype}."
+            )
+
+        with open_file(filename, "rt", codec) as fp:
+            for line in fp:
+                if not line.strip():  # skip blank lines between frames
+                    continue
+                natoms = int(line)
+                # frame = count line + comment line + natoms lines
+                frame = [line] + list(itertools.islice(fp, natoms + 1))
+                if len(frame) != natoms + 2:
+                    raise ValueError(
+                        f"Incomplete xyz frame: expected {natoms} atoms in {filename}."
+                    )
+                mol = qcelemental.models.Molecule.from_data(
+                    "".join(frame), dtype, **kwargs
+                )
+                yield cls(data=mol)
+
     @classmethod
     def from_schema(
-        cls, data: Molecule, version: Optional[int] = None, **kwargs: Dict[str, Any]
+        cls,
+        data: Molecule,
+        version: Optional[int] = None,
+        validate: str = "full",
+        cache: Optional[Union[ConversionCache, DiskConversionCache]] = None,
+        **kwargs: Dict[str, Any]
     ) -> "QCSchemaMol":
         """
         Constructs a QCSchema Molecule object from an MMSchema Molecule object.
@@ -76,6 +155,15 @@ class QCSchemaMol(ToolkitModel):
             Data to construct Molecule from.
         version: int, optional
             Schema version e.g. 1. Overrides data.schema_version.
+        validate: str, optional
+            Validation level: "full" (default) runs the qcelemental molparse validation,
+            "fast" runs only the model field validation, and "none" skips validation
+            altogether, including that of the intermediate translator models. Use
+            "fast" or "none" only for trusted input.
+        cache: ConversionCache or DiskConversionCache, optional
+            Cache to look the conversion up in, keyed by the content hash of data
+            and the conversion options. A ConversionCache hit returns the cached
+            (shared) QCSchema molecule, which must not be mutated.
         **kwargs
             Additional kwargs to pass to the constructors.
         Returns
@@ -83,40 +171,181 @@ class QCSchemaMol(ToolkitModel):
         QCSchemaMol
             A constructed QCSchema Molecule object.
         """
-        inputs = {
-            "schema_object": data,
-            "schema_version": version or data.schema_version,
-            "schema_name": kwargs.pop("schema_name", data.schema_name),
-            "keywords": kwargs,
-        }
-        out = MolToQCSchemaComponent.compute(inputs)
-        return cls(data=out.data_object, data_units=out.data_units)
+        if cache is not None:
+            key = content_hash(data, version=version, validate=validate, **kwargs)
+            qmol = cache.get(key)
+            if qmol is not None:
+                return cls(data=qmol, data_units=dict(qc_units))
+
+        schema_name = kwargs.pop("schema_name", data.schema_name)
+        if validate == "none":
+            qmol = MolToQCSchemaComponent.compute_batch([data], validate, **kwargs)[0]
+            data_units = dict(qc_units)
+        else:
+            inputs = {
+                "schema_object": data,
+                "schema_version": version or data.schema_version,
+                "schema_name": schema_name,
+                "keywords": {**kwargs, "validate": validate},
+            }
+            out = MolToQCSchemaComponent.compute(inputs)
+            qmol, data_units = out.data_object, out.data_units
+
+        if cache is not None:
+            cache.put(key, qmol)
+        return cls(data=qmol, data_units=data_units)
 
-    def to_file(self, filename: str, dtype: str = None, mode: str = None, **kwargs):
+    @classmethod
+    def from_schema_many(
+        cls, data: Sequence[Molecule], validate: str = "full"
+    ) -> List["QCSchemaMol"]:
+        """
+        Constructs QCSchema Molecule objects from a sequence of MMSchema Molecule objects.
+        Shared work e.g. unit conversion factors is done once per batch.
+        Parameters
+        ----------
+        data: Sequence[Molecule]
+            Data to construct Molecules from.
+        validate: str, optional
+            Validation level, see :meth:`from_schema`.
+        Returns
+        -------
+        List[QCSchemaMol]
+            Constructed QCSchema Molecule objects in the same order as data.
+        """
+        return [
+            cls(data=qmol, data_units=dict(qc_units))
+            for qmol in MolToQCSchemaComponent.compute_batch(data, validate)
+        ]
+
+    @classmethod
+    def from_schema_trajectory(
+        cls,
+        data: Molecule,
+        geometries: "numpy.ndarray",
+        geometry_units: Optional[str] = None,
+        validate: str = "full",
+    ) -> List["QCSchemaMol"]:
+        """
+        Constructs QCSchema Molecule objects from an MMSchema topology and a trajectory.
+        The topology is converted once and reused for every frame.
+        Parameters
+        ----------
+        data: Molecule
+            MMSchema molecule defining the topology.
+        geometries: numpy.ndarray
+            Frame geometries of shape (nframes, natoms, 3) or (nframes, natoms*3).
+        geometry_units: str, optional
+            Units of geometries. Defaults to data.geometry_units.
+        validate: str, optional
+            Validation level of the topology, see :meth:`from_schema`.
+        Returns
+        -------
+        List[QCSchemaMol]
+            Constructed QCSchema Molecule objects, one per frame.
+        """
+        return [
+            cls(data=qmol, data_units=dict(qc_units))
+            for qmol in MolToQCSchemaComponent.compute_trajectory(
+                data, geometries, geometry_units, validate
+            )
+        ]
+
+    def with_geometry(
+        self,
+        geometry: "numpy.ndarray",
+        geometry_units: str = "bohr",
+        copy: bool = True,
+    ) -> "QCSchemaMol":
+        """Returns a copy of the molecule with only its geometry replaced.
+        Everything else is reused without re-validation, see
+        :meth:`MolToQCSchemaComponent.update_geometry`.
+        Parameters
+        ----------
+        geometry: numpy.ndarray
+            New geometry of shape (natoms, 3) or (natoms*3,).
+        geometry_units: str, optional
+            Units of geometry. Defaults to bohr.
+        copy: bool, optional
+            If False, a geometry that needs no unit scaling is used without a copy.
+        Returns
+        -------
+        QCSchemaMol
+            The updated QCSchemaMol object.
+        """
+        qmol = MolToQCSchemaComponent.update_geometry(
+            self.data, geometry, geometry_units, copy
+        )
+        return type(self)(data=qmol, data_units=self.data_units)
+
+    def to_file(
+        self,
+        filename: str,
+        dtype: str = None,
+        mode: str = None,
+        compresslevel: Optional[int] = None,
+        **kwargs
+    ):
         """Writes the molecule to a file.
         Parameters
         ----------
         filename : str
             The filename to write to
         dtype : Optional[str], optional
-            File format
+            File format. Inferred from the file extension if not supplied.
+        compresslevel: int, optional
+            Compression level for filenames with a compression extension in
+            compression_ext_maps e.g. mol.msgpack.zst. Defaults to the codec default.
         **kwargs
-            Additional kwargs to pass to the constructors. kwargs takes precedence over  data.
+            Additional kwargs to pass to qcelemental.models.Molecule.to_file. Not
+            supported for compressed and qcmm files.
         """
         if mode:
             raise NotImplementedError("File write mode not supported in QCElemental.")
+        ext, codec = split_ext(filename)
+        if dtype is None:
+            dtype = molwrite_ext_maps.get(ext)
+
+        if kwargs and (dtype == "qcmm" or codec is not None):
+            raise TypeError(
+                f"Keyword arguments {sorted(kwargs)} are not supported for compressed and qcmm files."
+            )
 
-        self.data.to_file(filename, dtype, **kwargs)
+        if dtype == "qcmm":
+            if codec is not None:
+                raise NotImplementedError(
+                    "Compressed qcmm files cannot be memory-mapped."
+                )
+            write_qcmm(self.data, filename)
+        elif codec is not None:
+            _write_compressed(self.data, filename, dtype, codec, compresslevel)
+        else:
+            self.data.to_file(filename, dtype, **kwargs)
 
-    def to_schema(self, version: Optional[int] = 0, **kwargs) -> Molecule:
+    def to_schema(
+        self,
+        version: Optional[int] = 0,
+        cache: Optional[Union[ConversionCache, DiskConversionCache]] = None,
+        **kwargs
+    ) -> Molecule:
         """Converts the molecule to MMSchema molecule.
         Parameters
         ----------
         version: str, optional
             Schema specification version to comply with e.g. 1
+        cache: ConversionCache or DiskConversionCache, optional
+            Cache to look the conversion up in, see :meth:`from_schema`. A
+            ConversionCache hit returns the cached (shared) MMSchema molecule, which
+            must not be mutated.
         **kwargs
             Additional kwargs to pass to the constructor.
         """
+        if cache is not None:
+            key = content_hash(self.data, version=version, **kwargs)
+            mmol = cache.get(key)
+            if mmol is not None:
+                return mmol
+
         inputs = {
             "data_object": self.data,
             "schema_version": version,
@@ -126,4 +355,134 @@ class QCSchemaMol(ToolkitModel):
         out = QCSchemaToMolComponent.compute(inputs)
         if version:
             assert version == out.schema_version
+        if cache is not None:
+            cache.put(key, out.schema_object)
         return out.schema_object
+
+    @classmethod
+    def to_schema_many(
+        cls, data: Sequence[qcelemental.models.Molecule]
+    ) -> List[Molecule]:
+        """Converts a sequence of QCSchema molecules to MMSchema molecules.
+        Shared work e.g. unit conversion factors is done once per batch.
+        Parameters
+        ----------
+        data: Sequence[qcelemental.models.Molecule]
+            QCSchema molecules (or QCSchemaMol objects) to convert.
+        Returns
+        -------
+        List[Molecule]
+            Converted MMSchema molecules in the same order as data.
+        """
+        return QCSchemaToMolComponent.compute_batch(
+            [mol.data if isinstance(mol, cls) else mol for mol in data]
+        )
+
+    # Async API: CPU-bound conversions and file I/O run in an executor so they
+    # do not block the event loop. executor=None uses the loop's default executor.
+    @classmethod
+    async def afrom_file(
+        cls,
+        filename: str,
+        top_filename: Optional[str] = None,
+        dtype: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        **kwargs
+    ) -> "QCSchemaMol":
+        """Async counterpart of :meth:`from_file`, run in executor."""
+        return await _run_in_executor(
+            executor, cls.from_file, filename, top_filename, dtype, **kwargs
+        )
+
+    @classmethod
+    async def afrom_schema(
+        cls,
+        data: Molecule,
+        version: Optional[int] = None,
+        validate: str = "full",
+        executor: Optional[Executor] = None,
+        **kwargs: Dict[str, Any]
+    ) -> "QCSchemaMol":
+        """Async counterpart of :meth:`from_schema`, run in executor."""
+        return await _run_in_executor(
+            executor, cls.from_schema, data, version, validate, **kwargs
+        )
+
+    async def ato_file(
+        self,
+        filename: str,
+        dtype: str = None,
+        mode: str = None,
+        executor: Optional[Executor] = None,
+        **kwargs
+    ):
+        """Async counterpart of :meth:`to_file`, run in executor."""
+        return await _run_in_executor(
+            executor, self.to_file, filename, dtype, mode, **kwargs
+        )
+
+    async def ato_schema(
+        self, version: Optional[int] = 0, executor: Optional[Executor] = None, **kwargs
+    ) -> Molecule:
+        """Async counterpart of :meth:`to_schema`, run in executor."""
+        return await _run_in_executor(executor, self.to_schema, version, **kwargs)
+
+
+def _read_buffer(fp: IO, chunksize: int = 1 << 20) -> bytearray:
+    """Reads fp to the end into one growing buffer. fp.read() of a decompressing
+    file object joins the decompressed chunks, holding them twice."""
+    data = bytearray()
+    chunk = fp.read(chunksize)
+    while chunk:
+        data += chunk
+        chunk = fp.read(chunksize)
+    return data
+
+
+def _read_compressed(
+    filename: str, dtype: Optional[str], codec: str, **kwargs
+) -> qcelemental.models.Molecule:
+    """Reads a compressed molecule file like qcelemental.models.Molecule.from_file.
+    JSON and msgpack data are deserialized straight from a single buffer of the
+    decompressed bytes. Other (text) formats are decoded, which briefly holds both
+    the decompressed bytes and the decoded string."""
+    if dtype in ("json", "json-ext", "msgpack", "msgpack-ext"):
+        with open_file(filename, "rb", codec) as fp:
+            data = _read_buffer(fp)
+        if dtype.startswith("msgpack"):
+            data = msgpackext_loads(data)
+        else:
+            data = jsonext_loads(data)
+        dtype = "dict"
+    else:
+        with open_file(filename, "rt", codec) as fp:
+            data = fp.read()
+
+    return qcelemental.models.Molecule.from_data(data, dtype, **kwargs)
+
+
+def _write_compressed(
+    qcmol: qcelemental.models.Molecule,
+    filename: str,
+    dtype: Optional[str],
+    codec: str,
+    level: Optional[int] = None,
+):
+    """Writes a compressed molecule file like qcelemental.models.Molecule.to_file."""
+    if dtype in ("xyz", "xyz+", "psi4"):
+        stringified = qcmol.to_string(dtype)
+    elif dtype in ("json", "json-ext", "msgpack", "msgpack-ext"):
+        stringified = qcmol.serialize(dtype)
+    else:
+        raise KeyError(f"Dtype `{dtype}` is not valid for compressed files.")
+
+    mode = "wb" if dtype.startswith("msgpack") else "wt"
+    with open_file(filename, mode, codec, level) as fp:
+        fp.write(stringified)
+
+
+async def _run_in_executor(executor: Optional[Executor], func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(func, *args, **kwargs)
+    )
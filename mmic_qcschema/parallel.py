@@ -0,0 +1,126 @@
+"""
+parallel.py
+Process-pool parallel MMSchema <-> QCSchema conversion.
+
+Molecules are sent to and from the worker processes as serialized blobs rather
+than pickled pydantic models, and are converted in chunks so that each task
+amortizes the inter-process overhead over many molecules. QCSchema molecules
+are validated by the workers only, at the requested validation level.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Sequence
+import functools
+from .mmic_qcschema import serialization_encodings, _parse_mol
+
+__all__ = ["mol_to_qcschema", "qcschema_to_mol"]
+
+_encoding = serialization_encodings["qcschema"]
+_mm_encoding = serialization_encodings["mmschema"]
+
+
+def _chunks(blobs: List[bytes], chunksize: int) -> List[List[bytes]]:
+    return [blobs[i : i + chunksize] for i in range(0, len(blobs), chunksize)]
+
+
+def _mol_to_qcschema_chunk(blobs: List[bytes], validate: str) -> List[bytes]:
+    from .components import MolToQCSchemaComponent
+
+    mols = [_parse_mol(blob, "mmschema") for blob in blobs]
+    qmols = MolToQCSchemaComponent.compute_batch(mols, validate=validate)
+    return [qmol.serialize(_encoding) for qmol in qmols]
+
+
+def _qcschema_to_mol_chunk(blobs: List[bytes]) -> List[bytes]:
+    from .components import QCSchemaToMolComponent
+
+    qmols = [_parse_mol(blob, "qcschema") for blob in blobs]
+    mols = QCSchemaToMolComponent.compute_batch(qmols)
+    return [mol.serialize(_mm_encoding) for mol in mols]
+
+
+def _map_chunks(
+    func, blobs: List[bytes], chunksize: int, max_workers: Optional[int], executor
+) -> List[bytes]:
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be a positive integer, not {chunksize}.")
+
+    chunks = _chunks(blobs, chunksize)
+    if executor is not None:
+        results = list(executor.map(func, chunks))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(func, chunks))
+
+    # executor.map preserves the input order
+    return [blob for chunk in results for blob in chunk]
+
+
+def mol_to_qcschema(
+    mols: Sequence["mmelemental.models.Molecule"],
+    chunksize: int = 64,
+    max_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    validate: str = "full",
+) -> List["qcelemental.models.Molecule"]:
+    """Converts MMSchema molecules to QCSchema molecules in parallel.
+    Parameters
+    ----------
+    mols: Sequence[mmelemental.models.Molecule]
+        MMSchema molecules to convert.
+    chunksize: int, optional
+        Number of molecules converted per task.
+    max_workers: int, optional
+        Number of worker processes. Defaults to the number of CPUs. Ignored if
+        executor is supplied.
+    executor: Executor, optional
+        Executor to submit tasks to instead of a new ProcessPoolExecutor. It is
+        not shut down on return.
+    validate: str, optional
+        Validation level, see ``mmic_qcschema.components.mol_component.validation_levels``.
+    Returns
+    -------
+    List[qcelemental.models.Molecule]
+        QCSchema molecules in the same order as mols.
+    """
+    blobs = _map_chunks(
+        functools.partial(_mol_to_qcschema_chunk, validate=validate),
+        [mol.serialize(_mm_encoding) for mol in mols],
+        chunksize,
+        max_workers,
+        executor,
+    )
+    return [_parse_mol(blob, "qcschema") for blob in blobs]
+
+
+def qcschema_to_mol(
+    mols: Sequence["qcelemental.models.Molecule"],
+    chunksize: int = 64,
+    max_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> List["mmelemental.models.Molecule"]:
+    """Converts QCSchema molecules to MMSchema molecules in parallel.
+    Parameters
+    ----------
+    mols: Sequence[qcelemental.models.Molecule]
+        QCSchema molecules to convert.
+    chunksize: int, optional
+        Number of molecules converted per task.
+    max_workers: int, optional
+        Number of worker processes. Defaults to the number of CPUs. Ignored if
+        executor is supplied.
+    executor: Executor, optional
+        Executor to submit tasks to instead of a new ProcessPoolExecutor. It is
+        not shut down on return.
+    Returns
+    -------
+    List[mmelemental.models.Molecule]
+        MMSchema molecules in the same order as mols.
+    """
+    blobs = _map_chunks(
+        _qcschema_to_mol_chunk,
+        [mol.serialize(_encoding) for mol in mols],
+        chunksize,
+        max_workers,
+        executor,
+    )
+    return [_parse_mol(blob, "mmschema") for blob in blobs]
@@ -0,0 +1,158 @@
+"""
+profiling.py
+Opt-in per-stage timing of the MMSchema <-> QCSchema converters.
+
+Usage:
+    with mmic_qcschema.profiling.collect() as stats:
+        QCSchemaMol.from_schema(mmol)
+    print(stats.summary())
+
+Stages are named "<component>.<stage>", e.g. "MolToQCSchemaComponent.molecule".
+When no collector is active, timers are no-ops.
+
+The peak memory of a conversion can be measured in the same way:
+    with mmic_qcschema.profiling.memory() as mem:
+        QCSchemaMol.from_schema(mmol, chunksize=65536)
+    print(mem.peak)
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+import time
+import tracemalloc
+
+__all__ = ["collect", "memory", "timer", "MemoryStats", "StageStats"]
+
+# Active collectors, innermost last
+_collectors: List["StageStats"] = []
+
+
+class StageStats:
+    """Aggregated wall time statistics (in seconds) per conversion stage.
+    Parameters
+    ----------
+    callback: Callable[[str, float], None], optional
+        Called with (stage, elapsed) every time a stage is recorded.
+    """
+
+    def __init__(self, callback: Optional[Callable[[str, float], None]] = None):
+        self.callback = callback
+        self.count: Dict[str, int] = {}
+        self.total: Dict[str, float] = {}
+        self.min: Dict[str, float] = {}
+        self.max: Dict[str, float] = {}
+
+    def record(self, stage: str, elapsed: float):
+        if stage in self.count:
+            self.count[stage] += 1
+            self.total[stage] += elapsed
+            self.min[stage] = min(self.min[stage], elapsed)
+            self.max[stage] = max(self.max[stage], elapsed)
+        else:
+            self.count[stage] = 1
+            self.total[stage] = self.min[stage] = self.max[stage] = elapsed
+
+        if self.callback is not None:
+            self.callback(stage, elapsed)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Returns count, total, mean, min, and max wall time for every stage."""
+        return {
+            stage: {
+                "count": count,
+                "total": self.total[stage],
+                "mean": self.total[stage] / count,
+                "min": self.min[stage],
+                "max": self.max[stage],
+            }
+            for stage, count in self.count.items()
+        }
+
+
+class _Timer:
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.reset()
+
+    def reset(self):
+        self.last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """Records the time elapsed since the last lap (or reset) as stage."""
+        now = time.perf_counter()
+        for collector in _collectors:
+            collector.record(f"{self.prefix}.{stage}", now - self.last)
+        self.last = now
+
+
+class _NullTimer:
+    def reset(self):
+        pass
+
+    def lap(self, stage: str):
+        pass
+
+
+_null_timer = _NullTimer()
+
+
+def timer(prefix: str):
+    """Returns a stage timer for prefix, or a no-op timer if no collector is active."""
+    return _Timer(prefix) if _collectors else _null_timer
+
+
+@contextmanager
+def collect(
+    callback: Optional[Callable[[str, float], None]] = None
+) -> Iterator[StageStats]:
+    """Collects per-stage timings of all conversions run in this process within the
+    context.
+    Parameters
+    ----------
+    callback: Callable[[str, float], None], optional
+        Called with (stage, elapsed) every time a stage completes.
+    Returns
+    -------
+    StageStats
+        The aggregated stage statistics.
+    """
+    stats = StageStats(callback)
+    _collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors.remove(stats)
+
+
+class MemoryStats:
+    """Peak memory (in bytes) allocated within a :func:`memory` context, on top of
+    the memory already allocated when entering it."""
+
+    def __init__(self):
+        self.peak = 0
+
+
+@contextmanager
+def memory() -> Iterator[MemoryStats]:
+    """Measures the peak memory allocated by Python and numpy within the context
+    with tracemalloc. Tracing slows allocations down, so use it for profiling only.
+    If tracemalloc is already tracing, the peak cannot be reset before Python 3.9,
+    so an earlier, higher peak is reported instead.
+    Returns
+    -------
+    MemoryStats
+        The memory statistics, set when the context exits.
+    """
+    stats = MemoryStats()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    elif hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    start, _ = tracemalloc.get_traced_memory()
+    try:
+        yield stats
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        stats.peak = max(peak - start, 0)
+        if not tracing:
+            tracemalloc.stop()
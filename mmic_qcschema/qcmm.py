@@ -0,0 +1,155 @@
+"""
+qcmm.py
+Binary container format for large QCSchema molecules.
+
+A .qcmm file stores the per-atom arrays of a molecule as raw, 64-byte aligned
+arrays after a small JSON header:
+
+    b"QCMM" | uint32 format version | uint64 header size | JSON header | arrays
+
+The header lists the dtype, shape and offset of every array, plus all remaining
+(scalar) molecule fields. Reading memory-maps the arrays, so opening a file is
+nearly instant and only the pages that are actually used are read from disk.
+"""
+from typing import Any, Dict
+import json
+import struct
+import numpy
+import qcelemental
+from qcelemental.util.serialization import json_dumps
+from mmic_qcschema.components.mol_component import _connectivity_tuples
+
+__all__ = ["read_qcmm", "write_qcmm"]
+
+_magic = b"QCMM"
+_format_version = 1
+_prefix = struct.Struct("<4sIQ")
+_align = 64
+
+# Per-atom or per-bond array fields (by alias) stored as raw arrays
+_array_fields = {
+    "symbols",
+    "geometry",
+    "masses",
+    "real",
+    "atom_labels",
+    "atomic_numbers",
+    "mass_numbers",
+    "connectivity",
+}
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _align) * _align
+
+
+def write_qcmm(qcmol: qcelemental.models.Molecule, filename: str):
+    """Writes a QCSchema molecule to a .qcmm file.
+    Parameters
+    ----------
+    qcmol: qcelemental.models.Molecule
+        Molecule to write.
+    filename: str
+        Output filename.
+    """
+    fields = qcmol.dict()
+    arrays = {}
+    for key in _array_fields:
+        if fields.get(key) is not None:
+            value = fields.pop(key)
+            if key == "connectivity":
+                value = numpy.array(value, dtype=float).reshape(-1, 3)
+            arrays[key] = numpy.ascontiguousarray(value)
+
+    fragments = fields.pop("fragments", None)
+    if fragments is not None:
+        arrays["fragment_offsets"] = numpy.cumsum(
+            [0] + [len(frag) for frag in fragments]
+        )
+        arrays["fragments"] = (
+            numpy.concatenate(fragments) if fragments else numpy.zeros(0, dtype=int)
+        )
+
+    # offsets are relative to the end of the header, known once it is serialized
+    layout, offset = {}, 0
+    for key, value in arrays.items():
+        layout[key] = {
+            "dtype": value.dtype.str,
+            "shape": list(value.shape),
+            "offset": offset,
+        }
+        offset = _aligned(offset + value.nbytes)
+
+    header = json_dumps({"arrays": layout, "fields": fields}).encode()
+    header += b" " * (_aligned(_prefix.size + len(header)) - _prefix.size - len(header))
+
+    with open(filename, "wb") as fp:
+        fp.write(_prefix.pack(_magic, _format_version, len(header)))
+        fp.write(header)
+        start = fp.tell()
+        for key, value in arrays.items():
+            fp.seek(start + layout[key]["offset"])
+            fp.write(value.tobytes())
+
+
+def _read_header(filename: str) -> Dict[str, Any]:
+    with open(filename, "rb") as fp:
+        magic, version, size = _prefix.unpack(fp.read(_prefix.size))
+        if magic != _magic:
+            raise ValueError(f"{filename} is not a qcmm file.")
+        if version > _format_version:
+            raise ValueError(
+                f"qcmm format version {version} is newer than supported ({_format_version})."
+            )
+        header = json.loads(fp.read(size))
+
+    header["start"] = _prefix.size + size
+    return header
+
+
+def read_qcmm(
+    filename: str, mmap: bool = True, **kwargs
+) -> qcelemental.models.Molecule:
+    """Reads a QCSchema molecule from a .qcmm file.
+    Parameters
+    ----------
+    filename: str
+        Input filename.
+    mmap: bool, optional
+        Memory-map the arrays (read-only) instead of reading them into memory.
+    **kwargs
+        Additional fields to pass to the qcelemental.models.Molecule constructor.
+    Returns
+    -------
+    qcelemental.models.Molecule
+        The molecule. It is not re-validated since it was valid when written.
+    """
+    header = _read_header(filename)
+    arrays = {}
+    for key, meta in header["arrays"].items():
+        dtype, shape = numpy.dtype(meta["dtype"]), tuple(meta["shape"])
+        offset = header["start"] + meta["offset"]
+        if numpy.prod(shape) == 0:
+            arrays[key] = numpy.zeros(shape, dtype=dtype)
+        elif mmap:
+            arrays[key] = numpy.memmap(
+                filename, dtype=dtype, mode="r", offset=offset, shape=shape
+            )
+        else:
+            arrays[key] = numpy.fromfile(
+                filename, dtype=dtype, count=int(numpy.prod(shape)), offset=offset
+            ).reshape(shape)
+
+    fields = header["fields"]
+    if "fragments" in arrays:
+        offsets = arrays.pop("fragment_offsets")
+        fields["fragments"] = numpy.split(arrays.pop("fragments"), offsets[1:-1])
+    bonds = arrays.pop("connectivity", None)
+    fields.update(arrays)
+    fields.update(kwargs)
+
+    qcmol = qcelemental.models.Molecule(**fields, validate=False)
+    if bonds is not None and "connectivity" not in kwargs:
+        # attached as is, pydantic would validate the bonds one by one
+        qcmol = qcmol.copy(update={"connectivity_": _connectivity_tuples(bonds)})
+    return qcmol
@@ -0,0 +1,83 @@
+"""
+Benchmarks for the MMSchema <-> QCSchema converters and QCSchemaMol file I/O.
+
+Requires pytest-benchmark, e.g.
+    pytest mmic_qcschema/tests/test_benchmarks.py --benchmark-only
+Besides timings, each benchmark reports the throughput in atoms/s and the peak
+(traced) memory of a single call in its extra_info.
+"""
+import mmic_qcschema
+from mmic_qcschema.components import MolToQCSchemaComponent, QCSchemaToMolComponent
+import mmelemental as mmel
+import numpy
+import pytest
+import tracemalloc
+
+pytest.importorskip("pytest_benchmark")
+
+# number of water molecules i.e. 3 to ~100k atoms
+nwaters = [1, 100, 10_000, 33_334]
+
+water = numpy.array([[0.0, 0.0, 0.0], [0.0, 0.757, 0.587], [0.0, -0.757, 0.587]])
+
+
+def water_box(n: int) -> mmel.models.Molecule:
+    """Returns n water molecules on a cubic lattice with 3.1 angstrom spacing."""
+    side = int(numpy.ceil(n ** (1.0 / 3.0)))
+    grid = numpy.indices((side, side, side)).reshape(3, -1).T[:n] * 3.1
+    geometry = (grid[:, None, :] + water[None, :, :]).reshape(-1)
+    oxygens = numpy.arange(n) * 3
+    connectivity = [(i, i + 1, 1.0) for i in oxygens] + [
+        (i, i + 2, 1.0) for i in oxygens
+    ]
+    return mmel.models.Molecule(
+        symbols=["O", "H", "H"] * n,
+        geometry=geometry,
+        connectivity=connectivity,
+    )
+
+
+def run(benchmark, func, natoms: int, *args):
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rounds = max(1, min(100, 10_000 // natoms))
+    benchmark.pedantic(func, args=args, rounds=rounds, iterations=1)
+    benchmark.extra_info["natoms"] = natoms
+    benchmark.extra_info["peak_memory_mb"] = peak / 2 ** 20
+    benchmark.extra_info["atoms_per_s"] = natoms / benchmark.stats.stats.mean
+
+
+@pytest.mark.parametrize("n", nwaters)
+def test_bench_mm_to_qc(benchmark, n):
+    mmol = water_box(n)
+    inputs = {"schema_object": mmol, "schema_name": "mmschema", "schema_version": 1}
+    run(benchmark, MolToQCSchemaComponent.compute, 3 * n, inputs)
+
+
+@pytest.mark.parametrize("n", nwaters)
+def test_bench_qc_to_mm(benchmark, n):
+    qmol = MolToQCSchemaComponent.compute_batch([water_box(n)])[0]
+    inputs = {
+        "data_object": qmol,
+        "schema_name": qmol.schema_name,
+        "schema_version": qmol.schema_version,
+    }
+    run(benchmark, QCSchemaToMolComponent.compute, 3 * n, inputs)
+
+
+@pytest.mark.parametrize("ext", list(mmic_qcschema.molwrite_ext_maps))
+@pytest.mark.parametrize("n", nwaters)
+def test_bench_to_file(benchmark, n, ext, tmp_path):
+    qmol = mmic_qcschema.models.QCSchemaMol.from_schema(water_box(n))
+    run(benchmark, qmol.to_file, 3 * n, str(tmp_path / ("mol" + ext)))
+
+
+@pytest.mark.parametrize("ext", list(mmic_qcschema.molread_ext_maps))
+@pytest.mark.parametrize("n", nwaters)
+def test_bench_from_file(benchmark, n, ext, tmp_path):
+    filename = str(tmp_path / ("mol" + ext))
+    mmic_qcschema.models.QCSchemaMol.from_schema(water_box(n)).to_file(filename)
+    run(benchmark, mmic_qcschema.models.QCSchemaMol.from_file, 3 * n, filename)
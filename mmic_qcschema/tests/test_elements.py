@@ -0,0 +1,43 @@
+"""
+Tests for the element and isotope lookup tables.
+"""
+from mmic_qcschema import elements
+import qcelemental
+import numpy
+import pytest
+
+
+def test_element_tables():
+    table = qcelemental.periodictable
+    symbols = ["X", "H", "C", "O", "Fe", "U"]
+    atomic_numbers = elements.atomic_numbers(symbols + ["fe"])
+    assert atomic_numbers.tolist() == [table.to_Z(elem) for elem in symbols] + [26]
+
+    assert elements.mass_numbers(atomic_numbers[:-1]).tolist() == [
+        table.to_A(elem) for elem in symbols
+    ]
+    assert numpy.allclose(
+        elements.masses(atomic_numbers[:-1]), [table.to_mass(elem) for elem in symbols]
+    )
+    assert numpy.allclose(
+        elements.masses([1, 6], [2, 13]), [table.to_mass("D"), table.to_mass("C13")]
+    )
+
+
+def test_match_mass_numbers():
+    table = qcelemental.periodictable
+    masses = [table.to_mass("D"), 1.008, 15.999, table.to_mass("U235"), 300.0]
+    assert elements.match_mass_numbers([1, 1, 8, 92, 8], masses).tolist() == [
+        2,
+        1,
+        -1,
+        235,
+        -1,
+    ]
+
+
+def test_element_tables_invalid():
+    with pytest.raises(ValueError):
+        elements.masses([1], [9])
+    with pytest.raises(ValueError):
+        elements.mass_numbers([-1])
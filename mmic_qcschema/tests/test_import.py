@@ -0,0 +1,110 @@
+"""
+Tests that importing mmic_qcschema stays cheap.
+"""
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+# cold import budget in seconds, generous for slow shared filesystems
+import_budget = 1.0
+heavy_modules = ["qcelemental", "mmelemental", "mmic_translator", "pint"]
+
+
+def test_import_time():
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import mmic_qcschema\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(','.join(mod for mod in {heavy_modules} if mod in sys.modules))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout.split("\n")
+    assert out[1] == "", f"Heavy modules imported eagerly: {out[1]}"
+    assert float(out[0]) < import_budget
+
+
+def test_lazy_attributes():
+    import mmic_qcschema
+
+    assert mmic_qcschema.models.QCSchemaMol is mmic_qcschema._classes_map["Molecule"]
+    assert "components" in dir(mmic_qcschema)
+
+
+def test_import_no_subprocess():
+    code = (
+        "import subprocess\n"
+        "def forbidden(*args, **kwargs):\n"
+        "    raise RuntimeError('subprocess spawned on import')\n"
+        "subprocess.Popen = forbidden\n"
+        "import mmic_qcschema\n"
+        "from mmic_qcschema.mmic_qcschema import _get_versions\n"
+        "assert _get_versions.cache_info().currsize == 0\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_version():
+    import mmic_qcschema
+    from mmic_qcschema.mmic_qcschema import _get_versions
+
+    assert isinstance(mmic_qcschema.__version__, str)
+    misses = _get_versions.cache_info().misses
+    mmic_qcschema.__version__
+    assert _get_versions.cache_info().misses == misses  # resolved only once
+
+
+def test_version_static(monkeypatch):
+    from mmic_qcschema import _version, mmic_qcschema
+
+    # the static _version.py of sdists and builds, which carries the revision
+    versions = {"version": "1.2.3", "full-revisionid": "0123abcd", "dirty": False}
+    monkeypatch.setattr(_version, "version_json", json.dumps(versions), raising=False)
+    monkeypatch.setattr(_version, "get_versions", lambda: versions)
+    mmic_qcschema._get_versions.cache_clear()
+    try:
+        assert mmic_qcschema.__version__ == "1.2.3"
+        assert mmic_qcschema.__git_revision__ == "0123abcd"
+    finally:
+        mmic_qcschema._get_versions.cache_clear()
+
+
+def test_version_memo():
+    import mmic_qcschema
+
+    root = os.path.dirname(os.path.dirname(os.path.realpath(mmic_qcschema.__file__)))
+    if not os.path.isdir(os.path.join(root, ".git")):
+        pytest.skip("Not a git checkout.")
+
+    code = (
+        "import subprocess\n"
+        "from mmic_qcschema import _version, mmic_qcschema\n"
+        "print(mmic_qcschema._git_versions(_version)['version'])\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([root] + sys.path)}
+    first = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    # the version memoized by the first process is read without spawning git
+    code = (
+        "import subprocess\n"
+        "def forbidden(*args, **kwargs):\n"
+        "    raise RuntimeError('git spawned')\n"
+        "subprocess.Popen = forbidden\n" + code
+    )
+    second = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert second == first
@@ -6,7 +6,9 @@ Unit and regression test for the mmic_qcschema package.
 import mmic_qcschema
 from mmic_qcschema.components import MolToQCSchemaComponent, QCSchemaToMolComponent
 import mmelemental as mmel
+import qcelemental
 import mm_data
+import numpy
 import pytest
 import sys
 import os
@@ -78,3 +80,531 @@ def test_model(mmol):
     qmol = mmic_qcschema.models.QCSchemaMol.from_file("tmp.json")
     mmol = qmol.to_schema()
     os.remove("tmp.json")
+
+
+def test_mm_to_qc_batch():
+    qmols = MolToQCSchemaComponent.compute_batch(mmols)
+    assert len(qmols) == len(mmols)
+    for mmol, qmol in zip(mmols, qmols):
+        assert qmol == test_mm_to_qc(mmol)
+
+    qmols = mmic_qcschema.models.QCSchemaMol.from_schema_many(mmols)
+    assert [qmol.data.symbols.tolist() for qmol in qmols] == [
+        mmol.symbols.tolist() for mmol in mmols
+    ]
+
+
+def test_qc_to_mm_batch():
+    qmols = MolToQCSchemaComponent.compute_batch(mmols)
+    mmols_out = QCSchemaToMolComponent.compute_batch(qmols)
+    assert [mmol.symbols.tolist() for mmol in mmols_out] == [
+        mmol.symbols.tolist() for mmol in mmols
+    ]
+
+    mmols_out = mmic_qcschema.models.QCSchemaMol.to_schema_many(qmols)
+    assert len(mmols_out) == len(mmols)
+
+
+@pytest.mark.parametrize("validate", ["full", "fast", "none"])
+@pytest.mark.parametrize("mmol", mmols)
+def test_mm_to_qc_validate(mmol, validate):
+    qmol = mmic_qcschema.models.QCSchemaMol.from_schema(mmol, validate=validate)
+    ref = MolToQCSchemaComponent.compute_batch([mmol])[0]
+    assert qmol.data.symbols.tolist() == ref.symbols.tolist()
+    assert qmol.data.geometry.shape == ref.geometry.shape
+    assert qmol.data.molecular_charge == ref.molecular_charge
+
+
+def test_mm_to_qc_validate_invalid():
+    with pytest.raises(ValueError):
+        MolToQCSchemaComponent.compute_batch(mmols, validate="partial")
+
+
+def test_mm_to_qc_nocopy():
+    mmol = mmel.models.Molecule(
+        geometry=[0, 0, 0], symbols=["C"], geometry_units="bohr"
+    )
+    qmol = MolToQCSchemaComponent.compute_batch([mmol], validate="fast", copy=False)[0]
+    assert numpy.shares_memory(qmol.geometry, mmol.geometry)
+
+    qmol = MolToQCSchemaComponent.compute_batch([mmol], validate="fast")[0]
+    assert not numpy.shares_memory(qmol.geometry, mmol.geometry)
+
+    mmol_out = QCSchemaToMolComponent.compute_batch([qmol], copy=False)[0]
+    assert not numpy.shares_memory(qmol.geometry, mmol_out.geometry)
+
+
+def test_iter_file(tmp_path):
+    frame = "3\nwater\nO 0.0 0.0 0.0\nH 0.0 0.0 0.96\nH 0.0 0.93 -0.24\n"
+    filename = str(tmp_path / "frames.xyz")
+    with open(filename, "w") as fp:
+        fp.write(frame * 3)
+
+    qmols = list(mmic_qcschema.models.QCSchemaMol.iter_file(filename))
+    assert len(qmols) == 3
+    for qmol in qmols:
+        assert qmol.data.symbols.tolist() == ["O", "H", "H"]
+
+    with open(filename, "a") as fp:
+        fp.write("3\nwater\nO 0.0 0.0 0.0\n")
+    with pytest.raises(ValueError):
+        list(mmic_qcschema.models.QCSchemaMol.iter_file(filename))
+
+
+@pytest.mark.parametrize("mmol", mmols)
+def test_mm_to_qc_trajectory(mmol):
+    nframes = 4
+    geometries = numpy.stack(
+        [mmol.geometry.reshape(-1, 3) + 0.1 * i for i in range(nframes)]
+    )
+    qmols = MolToQCSchemaComponent.compute_trajectory(mmol, geometries)
+    assert len(qmols) == nframes
+
+    ref = MolToQCSchemaComponent.compute_batch([mmol])[0]
+    factor = mmic_qcschema.units.conversion_factor(mmol.geometry_units, "bohr")
+    for geometry, qmol in zip(geometries, qmols):
+        assert qmol.symbols.tolist() == ref.symbols.tolist()
+        assert numpy.allclose(qmol.geometry, geometry * factor)
+
+    with pytest.raises(ValueError):
+        MolToQCSchemaComponent.compute_trajectory(mmol, numpy.zeros((2, 100, 3)))
+
+
+def test_parallel():
+    from mmic_qcschema import parallel
+
+    qmols = parallel.mol_to_qcschema(mmols * 3, chunksize=2, max_workers=2)
+    assert [qmol.symbols.tolist() for qmol in qmols] == [
+        mmol.symbols.tolist() for mmol in mmols * 3
+    ]
+
+    mmols_out = parallel.qcschema_to_mol(qmols, chunksize=4, max_workers=2)
+    assert [mmol.symbols.tolist() for mmol in mmols_out] == [
+        mmol.symbols.tolist() for mmol in mmols * 3
+    ]
+
+
+@pytest.mark.parametrize("validate", ["fast", "none"])
+def test_parallel_validate(validate):
+    from mmic_qcschema import parallel
+
+    # too close for the "full" validation, which must not run in the parent
+    mmol = mmel.models.Molecule(
+        symbols=["H", "H"], geometry=[0, 0, 0, 0, 0, 0.01], geometry_units="bohr"
+    )
+    qmols = parallel.mol_to_qcschema([mmol] * 2, max_workers=2, validate=validate)
+    expected = MolToQCSchemaComponent.compute_batch([mmol], validate=validate)[0]
+    assert [qmol.get_hash() for qmol in qmols] == [expected.get_hash()] * 2
+    assert not any(qmol.validated for qmol in qmols)
+
+
+@pytest.mark.parametrize("mmol", mmols)
+def test_model_async(mmol, tmp_path):
+    import asyncio
+
+    filename = str(tmp_path / "tmp.json")
+
+    async def convert():
+        qmol = await mmic_qcschema.models.QCSchemaMol.afrom_schema(mmol)
+        await qmol.ato_file(filename)
+        qmol = await mmic_qcschema.models.QCSchemaMol.afrom_file(filename)
+        return await qmol.ato_schema()
+
+    mmol_out = asyncio.run(convert())
+    assert mmol_out.symbols.tolist() == mmol.symbols.tolist()
+
+
+def test_profiling():
+    from mmic_qcschema import profiling
+
+    recorded = []
+    with profiling.collect(callback=lambda *args: recorded.append(args)) as stats:
+        for mmol in mmols:
+            test_qc_to_mm(mmol)
+
+    summary = stats.summary()
+    for comp in ("MolToQCSchemaComponent", "QCSchemaToMolComponent"):
+        for stage in ("input", "units", "extras", "molecule", "output"):
+            assert summary[f"{comp}.{stage}"]["count"] == len(mmols)
+    assert len(recorded) == sum(val["count"] for val in summary.values())
+
+    # no collection outside the context
+    test_mm_to_qc(mmols[0])
+    assert stats.summary() == summary
+
+
+def test_conversion_cache():
+    from mmic_qcschema.cache import ConversionCache
+
+    cache = ConversionCache()
+    QCSchemaMol = mmic_qcschema.models.QCSchemaMol
+    for _ in range(3):
+        qmols = [QCSchemaMol.from_schema(mmol, cache=cache) for mmol in mmols]
+    assert cache.info()["misses"] == len(mmols)
+    assert cache.info()["hits"] == 2 * len(mmols)
+    assert QCSchemaMol.from_schema(mmols[0], cache=cache).data is qmols[0].data
+
+    # different conversion options are cached separately
+    QCSchemaMol.from_schema(mmols[0], validate="fast", cache=cache)
+    assert cache.misses == len(mmols) + 1
+
+    mmol = qmols[1].to_schema(cache=cache)
+    assert qmols[1].to_schema(cache=cache) is mmol
+
+    cache = ConversionCache(max_bytes=2048)
+    for mmol in mmols:
+        QCSchemaMol.from_schema(mmol, cache=cache)
+    assert cache.nbytes <= 2048
+    assert cache.evictions + len(cache) == len(mmols)
+
+
+def test_conversion_cache_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    from mmic_qcschema.cache import ConversionCache
+
+    # room for 4 values of 1024 (estimated) bytes, so puts keep evicting
+    cache = ConversionCache(max_bytes=4096)
+
+    def churn(start):
+        for i in range(2000):
+            key = str((start + i) % 16)
+            if cache.get(key) is None:
+                cache.put(key, object())
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(churn, range(8)))  # re-raises errors of the threads
+    assert cache.nbytes == 1024 * len(cache) <= 4096
+    assert cache.hits + cache.misses == 8 * 2000
+
+
+def test_disk_conversion_cache(tmp_path):
+    from mmic_qcschema.cache import DiskConversionCache
+
+    path = str(tmp_path / "cache.sqlite")
+    QCSchemaMol = mmic_qcschema.models.QCSchemaMol
+    cache = DiskConversionCache(path)
+    qmols = [QCSchemaMol.from_schema(mmol, cache=cache) for mmol in mmols]
+    assert cache.misses == len(mmols) and len(cache) == len(mmols)
+
+    # a new cache instance, e.g. in another process or run, hits
+    cache = DiskConversionCache(path)
+    for mmol, qmol in zip(mmols, qmols):
+        assert QCSchemaMol.from_schema(mmol, cache=cache).data == qmol.data
+    assert cache.hits == len(mmols) and cache.misses == 0
+
+    mmol = qmols[1].to_schema(cache=cache)
+    assert qmols[1].to_schema(cache=cache).symbols.tolist() == mmol.symbols.tolist()
+
+    nbytes = cache.nbytes
+    cache.put("replaced", qmols[0].data)
+    cache.put("replaced", qmols[0].data)
+    assert cache.nbytes == nbytes + len(qmols[0].data.serialize("msgpack-ext"))
+
+    cache = DiskConversionCache(path, max_bytes=nbytes // 2)
+    QCSchemaMol.from_schema(mmols[0], validate="fast", cache=cache)
+    assert cache.nbytes <= nbytes // 2
+
+
+def test_disk_conversion_cache_threads(tmp_path):
+    import asyncio
+    from mmic_qcschema.cache import DiskConversionCache
+
+    QCSchemaMol = mmic_qcschema.models.QCSchemaMol
+    cache = DiskConversionCache(str(tmp_path / "cache.sqlite"))
+    # too close for the "full" validation, which must not run on hits
+    mmol = mmel.models.Molecule(
+        symbols=["H", "H"], geometry=[0, 0, 0, 0, 0, 0.01], geometry_units="bohr"
+    )
+    qmol = QCSchemaMol.from_schema(mmol, validate="fast", cache=cache)
+
+    async def convert():
+        # afrom_schema looks up the cache from an executor thread
+        return await QCSchemaMol.afrom_schema(mmol, validate="fast", cache=cache)
+
+    assert asyncio.run(convert()).data == qmol.data
+    assert cache.hits == 1
+
+
+@pytest.mark.parametrize(
+    "ext", [".json.gz", ".msgpack.bz2", ".xyz.xz", ".json.zst", ".msgpack.zst"]
+)
+def test_model_compressed(ext, tmp_path):
+    if ext.endswith(".zst"):
+        pytest.importorskip("zstandard")
+
+    filename = str(tmp_path / ("mol" + ext))
+    qmol = mmic_qcschema.models.QCSchemaMol.from_schema(mmols[1])
+    qmol.to_file(filename, compresslevel=1)
+    qmol_read = mmic_qcschema.models.QCSchemaMol.from_file(filename)
+    assert qmol_read.data.symbols.tolist() == qmol.data.symbols.tolist()
+    assert numpy.allclose(qmol_read.data.geometry, qmol.data.geometry, atol=1e-5)
+
+    with pytest.raises(TypeError):
+        qmol.to_file(filename, prec=6)
+
+
+def test_dataset(tmp_path):
+    path = str(tmp_path / "dataset")
+    qmols = mmic_qcschema.models.QCSchemaMol.from_schema_many(mmols * 3)
+    keys = [f"mol{i}" for i in range(len(qmols))]
+    mmic_qcschema.models.QCSchemaDataset.write(path, qmols, keys=keys)
+
+    dataset = mmic_qcschema.models.QCSchemaDataset.open(path)
+    assert len(dataset) == len(qmols)
+    for qmol, qmol_read in zip(qmols, dataset):
+        assert qmol_read.data.get_hash() == qmol.data.get_hash()
+
+    assert dataset["mol3"].data.get_hash() == qmols[3].data.get_hash()
+    assert dataset[-1].data.get_hash() == qmols[-1].data.get_hash()
+    assert [qmol.data.get_hash() for qmol in dataset[1::2]] == [
+        qmol.data.get_hash() for qmol in qmols[1::2]
+    ]
+    with pytest.raises(KeyError):
+        dataset["missing"]
+
+
+def test_with_geometry():
+    qmol = mmic_qcschema.models.QCSchemaMol.from_schema(mmols[1])
+    geometry = qmol.data.geometry + 1.0
+    qmol_new = qmol.with_geometry(geometry)
+    assert numpy.allclose(qmol_new.data.geometry, geometry)
+    assert qmol_new.data.symbols is qmol.data.symbols
+    assert qmol_new.data.get_hash() != qmol.data.get_hash()
+
+    geometry_angstrom = geometry * qcelemental.constants.bohr2angstroms
+    qmol_angstrom = qmol.with_geometry(geometry_angstrom, "angstrom")
+    assert numpy.allclose(qmol_angstrom.data.geometry, geometry)
+
+    with pytest.raises(ValueError):
+        qmol.with_geometry(geometry[:-1])
+
+
+@pytest.mark.parametrize("validate", ["full", "fast", "none"])
+def test_inputs_unchanged(validate):
+    mmol = mmel.models.Molecule(
+        geometry=[0, 0, 0, 0, 0, 1],
+        symbols=["C", "O"],
+        atom_labels=["C1", "O1"],
+        extras={"payload": [1, 2, 3]},
+    )
+    mmol_dict = mmol.dict()
+    qmol = MolToQCSchemaComponent.compute_batch([mmol], validate)[0]
+    assert mmol.extras == {"payload": [1, 2, 3]}
+    assert mmol.dict().keys() == mmol_dict.keys()
+    assert qmol.extras["atom_labels"].tolist() == ["C1", "O1"]
+
+    qmol_extras = dict(qmol.extras)
+    mmol_back = QCSchemaToMolComponent.compute_batch([qmol])[0]
+    assert qmol.extras.keys() == qmol_extras.keys()
+    assert mmol_back.atom_labels.tolist() == ["C1", "O1"]
+    assert "atom_labels" not in mmol_back.extras
+
+
+@pytest.mark.parametrize("validate", ["full", "fast", "none"])
+def test_connectivity(validate):
+    mmol = mmel.models.Molecule(
+        geometry=[0, 0, 0, 0, 0, 1.1, 0, 1.0, -0.3],
+        symbols=["C", "O", "H"],
+        connectivity=[(1, 0, 2.0), (0, 2, 1.0), (0, 1, 2.0)],  # duplicate C=O bond
+    )
+    qmol = MolToQCSchemaComponent.compute_batch([mmol], validate)[0]
+    assert qmol.connectivity == [(0, 1, 2.0), (0, 2, 1.0)]
+
+    mmol_back = QCSchemaToMolComponent.compute_batch([qmol])[0]
+    assert mmol_back.connectivity.tolist() == [(0, 1, 2.0), (0, 2, 1.0)]
+
+    # bonds are ordered as in qcelemental, which keeps the molecule hash
+    connectivity = [(2, 1, 1.0), (0, 2, 1.0), (0, 1, 2.0)]
+    mmol = mmol.copy(update={"connectivity": connectivity})
+    qmol = MolToQCSchemaComponent.compute_batch([mmol], validate)[0]
+    assert qmol.connectivity == [(0, 2, 1.0), (0, 1, 2.0), (1, 2, 1.0)]
+    qcel_mol = qcelemental.models.Molecule(
+        symbols=qmol.symbols, geometry=qmol.geometry, connectivity=connectivity
+    )
+    assert qmol.connectivity == qcel_mol.connectivity
+    if validate == "full":
+        assert qmol.get_hash() == qcel_mol.get_hash()
+
+    mmol_invalid = mmel.models.Molecule(
+        geometry=[0, 0, 0, 0, 0, 1.1],
+        symbols=["C", "O"],
+        connectivity=[(0, 2, 1.0)],
+    )
+    with pytest.raises(ValueError):
+        MolToQCSchemaComponent.compute_batch([mmol_invalid], validate)
+
+
+@pytest.mark.parametrize("mmol", mmols)
+def test_mm_to_qc_chunked(mmol):
+    qmol = MolToQCSchemaComponent.compute_batch([mmol])[0]
+    qmol_chunked = MolToQCSchemaComponent.compute_batch([mmol], chunksize=2)[0]
+    assert qmol_chunked.get_hash() == qmol.get_hash()
+    assert qmol_chunked.dict().keys() == qmol.dict().keys()
+
+
+def test_mm_to_qc_chunked_overlap():
+    mmol = mmel.models.Molecule(geometry=[0, 0, 0, 0, 0, 0.01], symbols=["H", "H"])
+    with pytest.raises(ValueError):
+        MolToQCSchemaComponent.compute_batch([mmol], chunksize=1)
+
+
+def test_mm_to_qc_chunked_memory():
+    # 30k atoms in a box of waters 3.1 angstrom apart
+    n, side = 10_000, 22
+    water = numpy.array([[0.0, 0.0, 0.0], [0.0, 0.757, 0.587], [0.0, -0.757, 0.587]])
+    grid = numpy.indices((side, side, side)).reshape(3, -1).T[:n] * 3.1
+    mmol = mmel.models.Molecule(
+        symbols=["O", "H", "H"] * n,
+        geometry=(grid[:, None, :] + water[None, :, :]).reshape(-1),
+    )
+    MolToQCSchemaComponent.compute_batch(mmols, chunksize=1024)  # warm up caches
+
+    with mmic_qcschema.profiling.memory() as mem:
+        qmol = MolToQCSchemaComponent.compute_batch([mmol], chunksize=1024)[0]
+
+    size = qmol.geometry.nbytes + qmol.symbols.nbytes
+    assert mem.peak < 3 * size
+
+
+@pytest.mark.parametrize("validate", ["full", "fast", "none"])
+def test_mm_to_qc_fragments(validate):
+    # OH- and H3O+
+    mmol = mmel.models.Molecule(
+        symbols=["O", "H", "O", "H", "H", "H"],
+        geometry=[0, 0, 0, 0, 0, 0.97, 3, 0, 0, 3, 0, 1, 3, 0.9, -0.3, 3, -0.9, -0.3],
+        substructs=[("OH", 1)] * 2 + [("H3O", 2)] * 4,
+        formal_charges=[-1, 0, 1, 0, 0, 0],
+    )
+    qmol = MolToQCSchemaComponent.compute_batch([mmol], validate, fragments=True)[0]
+    assert [frag.tolist() for frag in qmol.fragments] == [[0, 1], [2, 3, 4, 5]]
+    assert qmol.fragment_charges == [-1.0, 1.0]
+    assert qmol.fragment_multiplicities == [1, 1]
+    assert qmol.extras["fragment_substructs"] == [["OH", 1], ["H3O", 2]]
+
+    # the substructures survive serialization
+    blob = qmol.serialize("msgpack-ext")
+    qmol_read = qcelemental.models.Molecule.parse_raw(blob, encoding="msgpack-ext")
+    mmol_back = QCSchemaToMolComponent.compute_batch([qmol_read])[0]
+    assert mmol_back.substructs.tolist() == mmol.substructs.tolist()
+
+    qmol = MolToQCSchemaComponent.compute_batch([mmol], validate)[0]
+    assert len(qmol.fragments) == 1
+
+
+@pytest.mark.parametrize("validate", ["full", "fast", "none"])
+def test_model_fragments(validate):
+    mmol = mmel.models.Molecule(
+        symbols=["O", "H", "H", "O", "H", "H"],
+        geometry=[0, 0, 0, 0, 0, 0.97, 0, 0.97, 0, 5, 0, 0, 5, 0, 0.97, 5, 0.97, 0],
+        substructs=[("HOH", 1)] * 3 + [("HOH", 2)] * 3,
+    )
+    cache = mmic_qcschema.cache.ConversionCache()
+    QCSchemaMol = mmic_qcschema.models.QCSchemaMol
+    for _ in range(2):  # a miss, then a hit
+        qmol = QCSchemaMol.from_schema(
+            mmol, validate=validate, cache=cache, fragments=True
+        )
+        assert len(qmol.data.fragments) == 2
+        assert qmol.data_units == mmic_qcschema.units.qc_units
+    assert cache.hits == 1
+
+
+@pytest.mark.parametrize(
+    "validate, chunksize", [("full", None), ("full", 2), ("fast", None), ("none", None)]
+)
+def test_mm_to_qc_fragments_noncontiguous(validate, chunksize):
+    mmol = mmel.models.Molecule(
+        symbols=["O", "H", "H", "O", "H", "H"],
+        geometry=[0, 0, 0, 0, 0, 1, 5, 0, 0, 0, 1, 0, 5, 0, 1, 5, 1, 0],
+        substructs=[
+            ("HOH", 1),
+            ("HOH", 1),
+            ("HOH", 2),
+            ("HOH", 1),
+            ("HOH", 2),
+            ("HOH", 2),
+        ],
+    )
+    with pytest.raises(ValueError, match="contiguous"):
+        MolToQCSchemaComponent.compute_batch(
+            [mmol], validate, chunksize=chunksize, fragments=True
+        )
+
+
+@pytest.mark.parametrize("validate", [False, True])
+def test_qc_to_mm_fragments(validate):
+    # two waters in non-contiguous fragment order, which qcel only keeps unvalidated
+    qmol = qcelemental.models.Molecule(
+        symbols=["O", "H", "H", "O", "H", "H"],
+        geometry=[0, 0, 0, 0, 0, 1.8, 1.8, 0, 0, 6, 0, 0, 6, 0, 1.8, 7.8, 0, 0],
+        fragments=[[3, 4, 5], [0, 1, 2]],
+        fragment_charges=[0, 0],
+        connectivity=[(0, 1, 1), (0, 2, 1), (3, 4, 1), (3, 5, 1), (2, 3, 1)],
+        validate=False,
+    )
+    mmol = QCSchemaToMolComponent.compute_batch([qmol])[0]
+    assert [tuple(sub) for sub in mmol.substructs] == [("FRAG", 1)] * 3 + [
+        ("FRAG", 0)
+    ] * 3
+
+    waters = QCSchemaToMolComponent.split_fragments(qmol, validate=validate)
+    assert len(waters) == 2
+    for water, frag in zip(waters, qmol.fragments):
+        assert water.symbols.tolist() == ["O", "H", "H"]
+        assert water.molecular_charge == 0
+        assert water.connectivity.tolist() == [(0, 1, 1.0), (0, 2, 1.0)]
+        assert numpy.allclose(
+            water.geometry.reshape(-1, 3),
+            qmol.geometry[frag]
+            * qcelemental.constants.conversion_factor("bohr", "angstrom"),
+        )
+    assert waters[0].get_hash() != waters[1].get_hash()
+
+
+@pytest.mark.parametrize(
+    "validate, chunksize", [("full", None), ("full", 2), ("fast", None), ("none", None)]
+)
+def test_masses(validate, chunksize):
+    def convert(masses, mass_numbers=None):
+        mmol = mmel.models.Molecule(
+            symbols=["O", "H", "H"],
+            geometry=[0, 0, 0, 0, 0, 0.97, 0, 0.97, 0],
+            masses=masses,
+            mass_numbers=mass_numbers,
+        )
+        qmol = MolToQCSchemaComponent.compute_batch(
+            [mmol], validate, chunksize=chunksize
+        )[0]
+        if masses is not None:
+            assert numpy.allclose(qmol.masses, masses)
+        return qmol
+
+    heavy_water = [15.99491461957, 2.01410177812, 2.01410177812]
+    for mass_numbers in ([16, 2, 2], None):
+        qmol = convert(heavy_water, mass_numbers)
+        assert qmol.mass_numbers.tolist() == [16, 2, 2]
+
+        mmol_back = QCSchemaToMolComponent.compute_batch([qmol])[0]
+        assert mmol_back.mass_numbers.tolist() == [16, 2, 2]
+        assert numpy.allclose(mmol_back.masses, heavy_water)
+
+    # the average mass of O matches no isotope, -1 leaves a mass number unset
+    qmol = convert([15.999, 1.008, 2.014], [-1, 1, -1])
+    assert qmol.mass_numbers.tolist() == [-1, 1, 2]
+    assert QCSchemaToMolComponent.compute_batch([qmol])[0].mass_numbers is None
+
+    qmol = convert([15.999, 1.008, 1.008])
+    assert qmol.mass_numbers.tolist() == [-1, 1, 1]
+    assert QCSchemaToMolComponent.compute_batch([qmol])[0].mass_numbers is None
+
+    # as in qcelemental, mass numbers must agree with the masses
+    for mass_numbers in ([16, 1, 1], [-1, 1, 1]):
+        with pytest.raises(ValueError, match="does not match its mass number"):
+            convert([15.999, 1.008, 2.014], mass_numbers)
+
+    # molecules without masses get qcelemental's defaults
+    qmol = convert(None)
+    assert qmol.mass_numbers.tolist() == [16, 1, 1]
+    if validate != "full":
+        assert qmol.__dict__.get("masses_") is None
+        assert qmol.__dict__.get("mass_numbers_") is None
@@ -0,0 +1,50 @@
+"""
+Tests for the memory-mapped qcmm container format.
+"""
+from mmic_qcschema.qcmm import read_qcmm, write_qcmm
+import qcelemental
+import numpy
+import pytest
+
+
+def is_memmap(array: numpy.ndarray) -> bool:
+    while array is not None:
+        if isinstance(array, numpy.memmap):
+            return True
+        array = array.base
+    return False
+
+
+@pytest.fixture
+def qcmol():
+    water = numpy.array([[0.0, 0.0, 0.0], [0.0, 1.43, 1.11], [0.0, -1.43, 1.11]])
+    return qcelemental.models.Molecule(
+        symbols=["O", "H", "H"] * 2,
+        geometry=numpy.concatenate([water, water + 6.0]),
+        fragments=[[0, 1, 2], [3, 4, 5]],
+        connectivity=[(0, 1, 1.0), (0, 2, 1.0), (3, 4, 1.0), (3, 5, 1.0)],
+        extras={"tag": "dimer"},
+    )
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_qcmm_roundtrip(qcmol, tmp_path, mmap):
+    filename = str(tmp_path / "mol.qcmm")
+    write_qcmm(qcmol, filename)
+    mol = read_qcmm(filename, mmap=mmap)
+
+    assert mol.get_hash() == qcmol.get_hash()
+    assert mol.symbols.tolist() == qcmol.symbols.tolist()
+    assert [frag.tolist() for frag in mol.fragments] == [[0, 1, 2], [3, 4, 5]]
+    assert mol.connectivity == qcmol.connectivity
+    assert {tuple(map(type, bond)) for bond in mol.connectivity} == {(int, int, float)}
+    assert mol.extras == {"tag": "dimer"}
+    assert is_memmap(mol.geometry) == mmap
+
+
+def test_qcmm_bad_file(tmp_path):
+    filename = str(tmp_path / "mol.qcmm")
+    with open(filename, "wb") as fp:
+        fp.write(b"\0" * 64)
+    with pytest.raises(ValueError):
+        read_qcmm(filename)
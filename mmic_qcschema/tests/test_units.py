@@ -0,0 +1,32 @@
+"""
+Tests for the cached unit conversion factors.
+"""
+from mmic_qcschema import units
+import mmelemental
+import qcelemental
+import pytest
+
+
+def test_conversion_factor_cached():
+    mm_units = mmelemental.models.Molecule.default_units
+    pairs = [
+        pair
+        for key, qc_unit in units.qc_units.items()
+        for pair in ((mm_units[key], qc_unit), (qc_unit, mm_units[key]))
+    ]
+    units.factor_cache_clear()
+    units.preload()
+    misses = units.factor_cache_info().misses
+    # pairs shared by both directions, e.g. of charges, are computed once
+    assert misses == len(set(pairs))
+
+    factor = units.conversion_factor("angstrom", "bohr")
+    assert factor == pytest.approx(
+        qcelemental.constants.conversion_factor("angstrom", "bohr")
+    )
+    for _ in range(10):
+        units.conversion_factor("angstrom", "bohr")
+
+    info = units.factor_cache_info()
+    assert info.misses == misses
+    assert info.hits >= 11
@@ -0,0 +1,70 @@
+"""
+units.py
+Cached unit conversion factors for MMSchema <-> QCSchema conversion.
+
+qcelemental.constants.conversion_factor parses unit strings with pint on
+every call. The factors needed here come from a handful of unit pairs, so
+they are computed once per process and served from a table afterwards.
+"""
+import functools
+from typing import Iterable, Tuple
+import qcelemental
+
+__all__ = ["conversion_factor", "factor_cache_info", "factor_cache_clear", "preload"]
+
+# QCSchema units for each MMSchema units field
+qc_units = {
+    "geometry_units": "bohr",
+    "molecular_charge_units": "elementary_charge",
+    "masses_units": "atomic_mass_unit",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def conversion_factor(from_unit: str, to_unit: str) -> float:
+    """Returns the factor converting from_unit to to_unit. Only the first call for
+    a given (from_unit, to_unit) pair reaches pint.
+    Parameters
+    ----------
+    from_unit: str
+        Units to convert from e.g. "angstrom".
+    to_unit: str
+        Units to convert to e.g. "bohr".
+    Returns
+    -------
+    float
+        The conversion factor.
+    """
+    return float(qcelemental.constants.conversion_factor(from_unit, to_unit))
+
+
+def factor_cache_info():
+    """Returns (hits, misses, maxsize, currsize) statistics of the conversion factor
+    table. Misses count the calls that went through pint."""
+    return conversion_factor.cache_info()
+
+
+def factor_cache_clear():
+    """Empties the conversion factor table and resets its statistics."""
+    conversion_factor.cache_clear()
+
+
+def preload(pairs: Iterable[Tuple[str, str]] = None):
+    """Fills the conversion factor table ahead of time.
+    Parameters
+    ----------
+    pairs: Iterable[Tuple[str, str]], optional
+        (from_unit, to_unit) pairs to compute. Defaults to the MMSchema default
+        units to/from their QCSchema counterparts.
+    """
+    if pairs is None:
+        import mmelemental
+
+        mm_units = mmelemental.models.Molecule.default_units
+        pairs = []
+        for key, qc_unit in qc_units.items():
+            pairs.append((mm_units[key], qc_unit))
+            pairs.append((qc_unit, mm_units[key]))
+
+    for from_unit, to_unit in pairs:
+        conversion_factor(from_unit, to_unit)